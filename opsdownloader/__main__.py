@@ -1,9 +1,34 @@
+import cProfile
+import pstats
+import sys
+
 from .app.app import App
+from .config import config
+from .utils.arg_parser import get_args
 
 
 def main():
+    args = get_args()
     app = App()
-    app.run()
+    config.set_cli_args(args)
+
+    run = app.run
+    if config.verify_library:
+        run = app.verify_library
+    elif config.daemon_mode:
+        run = app.run_daemon
+
+    try:
+        if config.profile:
+            profiler = cProfile.Profile()
+            try:
+                profiler.runcall(run)
+            finally:
+                pstats.Stats(profiler).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(30)
+        else:
+            run()
+    except KeyboardInterrupt:
+        sys.exit(130)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,31 @@
+import itertools
+import time
 from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+from urllib.parse import urlparse
 
-from colored import attr
+from colored import attr, fg
 from tealprint import TealPrint
 
 from ..config import config
+from ..core.episode import Episode
 from ..core.type import Types
 from ..gateways.config_gateway import ConfigGateway
 from ..gateways.downloader import Downloader
 from ..gateways.encoder import Encoder
-from ..gateways.ops import OPS
+from ..gateways.journal import Journal
+from ..gateways.ops_http import OPSHttp
+from ..gateways.ops_pool import OPSPool
 from ..gateways.plex import Plex
+from ..gateways.subtitler import Subtitler
+from ..gateways.url_cache import UrlCache
+from ..gateways.verifier import Verifier
+from ..utils.files import same_filesystem
+from ..utils.metrics import metrics
+from ..utils.resilience import RetryPolicy
+from .daemon import Daemon
+from .pipeline import Pipeline, Stage
 
 
 class App:
@@ -19,23 +35,241 @@ class App:
         configGateway.read()
         config.general = configGateway.get_general()
         config.ops = configGateway.get_ops()
+        config.pipeline = configGateway.get_pipeline()
+        config.downloader = configGateway.get_downloader()
+        config.retry = configGateway.get_retry()
+        config.subtitles = configGateway.get_subtitles()
+        config.daemon = configGateway.get_daemon()
+        config.downloader.scratch_dir = App._scratch_dir(config.downloader.scratch_dir, config.general.plex_dir)
 
         self.plex = Plex(config.general.plex_dir)
-        self.downloader = Downloader()
+        self.downloader = Downloader(
+            config.downloader.scratch_dir,
+            workers=config.pipeline.download_workers,
+            bandwidth_limit=config.downloader.bandwidth_limit,
+            host_connections=config.downloader.host_connections,
+            # Subtitles are added when rerendering, together with the title
+            single_pass=config.downloader.single_pass and not config.subtitles.enabled,
+            native_dash=config.downloader.native_dash,
+            segment_connections=config.downloader.segment_connections,
+        )
         self.encoder = Encoder()
+        self.subtitler: Optional[Subtitler] = None
+        if config.subtitles.enabled:
+            self.subtitler = Subtitler(
+                Path.home().joinpath(f".{config.app_name}-subtitles"),
+                model=config.subtitles.model,
+                language=config.subtitles.language,
+                workers=config.subtitles.workers,
+            )
+        self.verifier = Verifier()
+        self.url_cache = UrlCache(default_ttl=config.ops.url_cache_ttl * 3600)
+        self.journal = Journal(config.downloader.scratch_dir / f"{config.app_name}-journal.jsonl")
+        self.retry = RetryPolicy(
+            attempts=config.retry.attempts,
+            backoff=config.retry.backoff,
+            max_backoff=config.retry.max_backoff,
+            breaker_failures=config.retry.breaker_failures,
+            breaker_reset=config.retry.breaker_reset,
+        )
+        self._ops: Optional[Union[OPSPool, OPSHttp]] = None
+        self._ops_started = 0.0
 
     def run(self) -> None:
-        for type in config.general.types:
-            self._run_type(type)
+        try:
+            self._run()
+        finally:
+            self.close()
+            App._report_metrics()
 
-    def _run_type(self, type: Types) -> None:
+    def poll(self) -> int:
+        """Download new episodes and keep the OPS session open for the next poll
+
+        Returns:
+            Number of new episodes that were found
+        """
+        try:
+            return self._run()
+        finally:
+            App._report_metrics()
+            metrics.clear()
+
+    def run_daemon(self) -> None:
+        Daemon(
+            self,
+            interval=config.daemon.interval * 60,
+            max_interval=config.daemon.max_interval * 60,
+            jitter=config.daemon.jitter,
+            status_host=config.daemon.status_host,
+            status_port=config.daemon.status_port,
+        ).run()
+
+    def close(self) -> None:
+        if self._ops:
+            self._ops.close()
+            self._ops = None
+
+    def verify_library(self) -> None:
+        failed = self.plex.verify_library(self.verifier, config.pipeline.verify_workers)
+        if len(failed) == 0:
+            TealPrint.info("All episodes in the library are complete", color=fg("green"))
+            return
+
+        TealPrint.warning(f"{len(failed)} episodes in the library are incomplete or broken", push_indent=True)
+        for file in failed:
+            TealPrint.warning(str(file))
+        TealPrint.pop_indent()
+
+    def _run(self) -> int:
         # Get latest downloaded episode name and internal number
-        episode_info = self.plex.get_last_episode_info(type)
+        with metrics.measure("Scan Plex library"):
+            latest_episodes = {type: self.plex.get_last_episode_info(type) for type in config.general.types}
+
+        # Don't start a browser or log in when there's nothing new
+        with metrics.measure("Check for new episodes"):
+            probe = OPSHttp()
+            has_new_episodes = probe.has_new_episodes(latest_episodes)
+            probe.close()
+        if has_new_episodes is False:
+            TealPrint.info("No new episodes")
+            return 0
+
+        ops = self._get_ops()
+
+        # Get new episodes for all types from OPS site in one pass
+        with metrics.measure("Find new episodes"):
+            new_episodes = self.retry.call("Find new episodes", lambda: ops.get_new_episodes_for_types(latest_episodes))
+
+        self._run_types(latest_episodes, new_episodes, ops)
+        return sum(len(type_episodes) for type_episodes in new_episodes.values())
+
+    def _get_ops(self) -> Union[OPSPool, OPSHttp]:
+        """Share the same browser and login for all types and polls. A new one is started when the
+        login is older than session_max_age"""
+        if self._ops and time.time() - self._ops_started > config.ops.session_max_age * 3600:
+            self.close()
+
+        if not self._ops:
+            self._ops = App._create_ops()
+            self._ops_started = time.time()
+        return self._ops
+
+    @staticmethod
+    def _create_ops() -> Union[OPSPool, OPSHttp]:
+        if config.ops.backend == "selenium":
+            return OPSPool(config.ops.resolvers)
+        return OPSHttp()
+
+    @staticmethod
+    def _scratch_dir(scratch_dir: Path, plex_dir: Path) -> Path:
+        """Stage downloads on the same filesystem as Plex, so episodes are moved there with a rename instead of
+        being copied. Uses a hidden directory in plex_dir when scratch_dir isn't set or is on another filesystem"""
+        try:
+            if scratch_dir != Path(""):
+                scratch_dir.mkdir(parents=True, exist_ok=True)
+                if same_filesystem(scratch_dir, plex_dir):
+                    return scratch_dir
 
-        # Get new episodes from OPS site
-        ops = OPS()
-        new_episodes = ops.get_new_episodes(type, episode_info)
+            staging_dir = plex_dir / f".{config.app_name}-scratch"
+            staging_dir.mkdir(exist_ok=True)
+        except OSError as e:
+            TealPrint.warning(f"Could not stage downloads in {plex_dir}, episodes are copied to Plex; {e}")
+            return scratch_dir
 
+        if scratch_dir != Path(""):
+            TealPrint.verbose(f"{scratch_dir} is on another filesystem than Plex, downloading to {staging_dir}")
+        return staging_dir
+
+    @staticmethod
+    def _report_metrics() -> None:
+        metrics.print_summary()
+        if config.general.metrics_file:
+            metrics.write(config.general.metrics_file)
+
+    def _run_types(
+        self,
+        latest_episodes: Dict[Types, Episode],
+        new_episodes: Dict[Types, List[Episode]],
+        ops: Union[OPSPool, OPSHttp],
+    ) -> None:
+        """Run the new episodes of all types through one pipeline so that all resources are kept busy"""
+        for type, type_episodes in new_episodes.items():
+            App._number_episodes(latest_episodes[type], type_episodes)
+
+        # Take turns between the types, episodes enter the pipeline in this order so a backlog of one type
+        # would otherwise hold up all other types
+        episodes: List[Episode] = []
+        for turn in itertools.zip_longest(*new_episodes.values()):
+            episodes.extend(episode for episode in turn if episode)
+
+        if config.pretend:
+            return
+
+        stages = [
+            Stage(
+                "Get download URL",
+                self._cached_download_url(ops),
+                resource="browser",
+                host=lambda episode: App._host(episode.ops.url),
+            ),
+            Stage(
+                "Download",
+                self._journaled("download", self.downloader.download),
+                resource="network",
+                host=lambda episode: App._host(episode.ops.download_url),
+            ),
+        ]
+        limits = {
+            "browser": config.ops.resolvers,
+            "network": config.pipeline.download_workers,
+            "cpu": config.pipeline.encode_workers,
+            "disk": config.pipeline.verify_workers,
+        }
+        if self.subtitler:
+            # Transcribed in its own processes with its own limit, so later episodes keep downloading
+            stages.append(
+                Stage("Generate subtitles", self._journaled("subtitles", self.subtitler.generate), resource="subtitles")
+            )
+            limits["subtitles"] = self.subtitler.workers
+        stages.extend(
+            [
+                # Rerender with correct metadata title
+                Stage("Rerender", self._journaled("rerender", self.encoder.rerender), resource="cpu"),
+                # Check that the file is complete before it's added to the library
+                Stage("Verify", self.verifier.verify, resource="disk"),
+                # Move to plex directory in episode order
+                Stage("Move to Plex", self._journaled("move", self.plex.move_episode), ordered=True, resource="disk"),
+            ]
+        )
+
+        pipeline = Pipeline(stages, queue_size=config.pipeline.queue_size, limits=limits, retry=self.retry)
+        try:
+            pipeline.run(episodes)
+        finally:
+            if self.subtitler:
+                self.subtitler.close()
+        App._print_failures(pipeline)
+
+    @staticmethod
+    def _print_failures(pipeline: Pipeline) -> None:
+        if len(pipeline.failures) == 0:
+            return
+
+        TealPrint.warning(f"{len(pipeline.failures)} episodes will be tried again in the next run", push_indent=True)
+        for failure in pipeline.failures:
+            episode = failure.episode
+            if failure.error:
+                TealPrint.warning(f"{episode.ops.number}: {episode.title}; {failure.stage} failed; {failure.error}")
+            else:
+                TealPrint.warning(f"{episode.ops.number}: {episode.title}; waiting for an earlier episode")
+        TealPrint.pop_indent()
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlparse(url).hostname or ""
+
+    @staticmethod
+    def _number_episodes(episode_info: Episode, new_episodes: List[Episode]) -> None:
         next_number = 1
         if episode_info.season == datetime.now().year:
             next_number = episode_info.number + 1
@@ -43,20 +277,37 @@ class App:
         for episode in new_episodes:
             episode.number = next_number
             next_number += 1
+            TealPrint.info(f"Episode {episode.number}: {episode.title}", color=attr("bold"))
 
-            TealPrint.info(f"Episode {episode.number}: {episode.title}", color=attr("bold"), push_indent=True)
-            ops.get_download_url(episode)
+    def _cached_download_url(self, ops: Union[OPSPool, OPSHttp]) -> Callable[[Episode], None]:
+        """Use the download URL from the cache if it's still valid, else get it from OPS and cache it.
+        Skipped when an earlier run has already downloaded the episode, the journal has its URL"""
 
-            self.downloader.download(episode)
+        def run(episode: Episode) -> None:
+            if self.journal.restore(episode, "download"):
+                TealPrint.info(f"Already downloaded {episode.title}, skipping its download URL")
+                return
+
+            download_url = self.url_cache.get(episode.ops.url)
+            if download_url:
+                TealPrint.info(f"Using cached download URL for {episode.ops.number}: {episode.title}")
+                episode.ops.download_url = download_url
+                return
+
+            ops.get_download_url(episode)
+            self.url_cache.put(episode.ops.url, episode.ops.download_url)
 
-            # TODO Generate subtitles
+        return run
 
-            # Rerender with correct metadata title
-            self.encoder.rerender(episode)
+    def _journaled(self, stage: str, func: Callable[[Episode], None]) -> Callable[[Episode], None]:
+        """Skip the stage if the journal says it was completed in an earlier run, else run and record it"""
 
-            # Move to plex directory
-            self.plex.move_episode(episode)
+        def run(episode: Episode) -> None:
+            if self.journal.restore(episode, stage):
+                TealPrint.info(f"Already done '{stage}' for {episode.title}")
+                return
 
-            TealPrint.pop_indent()
+            func(episode)
+            self.journal.record(episode, stage)
 
-        ops.close()
+        return run
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import random
+import signal
+import time
+from threading import Event, Lock
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from colored import attr
+from tealprint import TealPrint
+
+from ..gateways.status_server import StatusServer
+
+if TYPE_CHECKING:
+    from .app import App
+
+
+class Daemon:
+    """Keeps the app running and polls for new episodes, so the browser, login and Plex index are only
+    set up once instead of for every run.
+
+    Polls every interval seconds while new episodes are found. While nothing is new, or polls fail, the
+    time between polls is doubled up to max_interval. SIGTERM stops the daemon after the current poll.
+
+    Args:
+        interval (float): Seconds between polls
+        max_interval (float): Max seconds between polls when there's nothing new
+        jitter (float): Random part of the time between polls, 0.1 is up to 10% earlier or later
+        status_port (int): Port of the status server, 0 to not start it
+    """
+
+    def __init__(
+        self,
+        app: App,
+        interval: float = 900,
+        max_interval: float = 7200,
+        jitter: float = 0.1,
+        status_host: str = "127.0.0.1",
+        status_port: int = 8765,
+    ) -> None:
+        self.app = app
+        self.interval = max(1.0, interval)
+        self.max_interval = max(self.interval, max_interval)
+        self.jitter = min(max(0.0, jitter), 1.0)
+        self.server: Optional[StatusServer] = None
+        if status_port:
+            self.server = StatusServer(status_host, status_port, self.status, self.healthy)
+
+        self._stop = Event()
+        self._lock = Lock()
+        self._state = "starting"
+        self._started = time.time()
+        self._polls = 0
+        self._episodes = 0
+        self._last_poll: Optional[float] = None
+        self._last_success: Optional[float] = None
+        self._last_error = ""
+        self._next_poll: Optional[float] = None
+        self._delay = self.interval
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        if self.server:
+            self.server.start()
+
+        try:
+            while not self._stop.is_set():
+                self._poll()
+                wait = self._delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+                with self._lock:
+                    self._state = "waiting"
+                    self._next_poll = time.time() + wait
+                TealPrint.info(f"Checking for new episodes again in {wait / 60:.0f} minutes")
+                self._stop.wait(wait)
+        finally:
+            with self._lock:
+                self._state = "stopping"
+            self.app.close()
+            if self.server:
+                self.server.close()
+
+    def stop(self) -> None:
+        TealPrint.info("Stopping after the current poll")
+        self._stop.set()
+
+    def healthy(self) -> bool:
+        """Healthy until a poll fails, and as long as polls keep happening"""
+        with self._lock:
+            if self._last_error:
+                return False
+            last = self._last_poll or self._started
+            return time.time() - last < self.max_interval * (1 + self.jitter) * 2
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "started": self._started,
+                "polls": self._polls,
+                "episodes": self._episodes,
+                "last_poll": self._last_poll,
+                "last_success": self._last_success,
+                "last_error": self._last_error,
+                "next_poll": self._next_poll,
+                "interval": self._delay,
+            }
+
+    def _poll(self) -> None:
+        with self._lock:
+            self._state = "polling"
+            self._last_poll = time.time()
+            self._next_poll = None
+        TealPrint.info(f"Checking for new episodes at {time.strftime('%Y-%m-%d %H:%M')}", color=attr("bold"))
+
+        try:
+            count = self.app.poll()
+        except Exception as e:
+            TealPrint.error(f"Checking for new episodes failed; {e}")
+            # Start over with a new browser and login in case the session is broken
+            self.app.close()
+            with self._lock:
+                self._polls += 1
+                self._last_error = str(e) or type(e).__name__
+            self._delay = min(self.max_interval, self._delay * 2)
+            return
+
+        with self._lock:
+            self._polls += 1
+            self._episodes += count
+            self._last_success = time.time()
+            self._last_error = ""
+        self._delay = self.interval if count > 0 else min(self.max_interval, self._delay * 2)
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set
+
+from tealprint import TealPrint
+
+from ..core.episode import Episode
+from ..core.type import Types
+from ..utils.metrics import metrics
+from ..utils.resilience import RetryPolicy
+
+
+class Stage:
+    """One step of the pipeline, e.g. download or remux.
+
+    Args:
+        name (str): Name of the stage, used in log messages
+        func (Callable[[Episode], None]): Blocking function that processes an episode in-place
+        workers (int): Number of episodes this stage processes concurrently, unless the resource has a limit
+        ordered (bool): If the episodes should be processed in the same order they were added to the pipeline.
+            The order is kept for each type of episode, and an ordered stage processes one episode at a time.
+        resource (str): Resource that the stage uses, e.g. network or disk. Stages that use the same
+            resource share its limit. Defaults to the name of the stage.
+        host (Callable[[Episode], str]): Host that the stage connects to for an episode. Stages that
+            connect to the same host share a circuit breaker. None for stages that only work locally.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Episode], None],
+        workers: int = 1,
+        ordered: bool = False,
+        resource: str = "",
+        host: Optional[Callable[[Episode], str]] = None,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.ordered = ordered
+        self.workers = 1 if ordered else max(1, workers)
+        self.resource = resource or name
+        self.host = host
+
+
+class Failure:
+    """An episode that was taken out of the pipeline, it's tried again in the next run"""
+
+    def __init__(self, episode: Episode, stage: str, error: Optional[BaseException] = None) -> None:
+        self.episode = episode
+        self.stage = stage
+        # None when the episode was held back because an earlier episode failed
+        self.error = error
+
+
+class _Job:
+    def __init__(self, index: int, episode: Episode) -> None:
+        self.index = index
+        self.episode = episode
+        self.failed = False
+
+
+class Pipeline:
+    """Runs episodes through a list of stages on an asyncio event loop.
+
+    Every episode moves through the stages as its own task, and the blocking stage functions run in a
+    thread pool. How many episodes a stage processes at the same time is limited per resource, so e.g.
+    the next download starts while the previous episode is being remuxed, and stages that use the disk
+    don't compete with each other. At most queue_size episodes wait between the stages.
+
+    Transient errors are retried with backoff, without holding the resource while waiting. An episode
+    that still fails is quarantined: it skips the rest of the stages and the other episodes keep going.
+    Ordered stages hold back the later episodes of the same type, so that no episode is skipped in the
+    library. Quarantined and held back episodes are listed in failures after run().
+
+    On SIGINT no new work is started and the remaining episodes are passed through without being
+    processed. Work that has already started is finished, then KeyboardInterrupt is raised from run().
+
+    Args:
+        stages (List[Stage]): Stages that every episode goes through in order
+        queue_size (int): Max number of episodes that wait between stages
+        limits (Dict[str, int]): Max concurrency for each resource, overrides the workers of the stages
+        retry (RetryPolicy): How failed stages are retried, defaults to no retries
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        queue_size: int = 2,
+        limits: Optional[Dict[str, int]] = None,
+        retry: Optional[RetryPolicy] = None,
+    ) -> None:
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.limits: Dict[str, int] = {}
+        for stage in stages:
+            limit = (limits or {}).get(stage.resource, stage.workers)
+            self.limits[stage.resource] = max(self.limits.get(stage.resource, 1), limit)
+        self.retry = retry or RetryPolicy(attempts=1, breaker_failures=0)
+        self.failures: List[Failure] = []
+        self._error: Optional[BaseException] = None
+
+    def run(self, episodes: List[Episode]) -> None:
+        if len(episodes) == 0:
+            return
+
+        asyncio.run(self._run(episodes))
+
+        if self._error:
+            raise self._error
+
+    async def _run(self, episodes: List[Episode]) -> None:
+        self._abort = asyncio.Event()
+        self._resources = {resource: asyncio.Semaphore(limit) for resource, limit in self.limits.items()}
+        self._in_flight = asyncio.Semaphore(sum(self.limits.values()) + self.queue_size)
+        self._ordered = asyncio.Condition()
+        self._next_index: Dict[Types, Dict[str, int]] = {}
+        self._held: Set[Types] = set()
+
+        # Index within the type, ordered stages keep that order
+        jobs: List[_Job] = []
+        counts: Dict[Types, int] = {}
+        for episode in episodes:
+            index = counts.get(episode.type, 0)
+            counts[episode.type] = index + 1
+            jobs.append(_Job(index, episode))
+
+        loop = asyncio.get_running_loop()
+        self._handle_sigint(loop)
+        self._executor = ThreadPoolExecutor(sum(self.limits.values()), thread_name_prefix="pipeline")
+        try:
+            await asyncio.gather(*(self._run_job(job) for job in jobs))
+        finally:
+            self._executor.shutdown(wait=True)
+            self._remove_sigint_handler(loop)
+
+    async def _run_job(self, job: _Job) -> None:
+        async with self._in_flight:
+            for stage in self.stages:
+                if stage.ordered:
+                    await self._run_ordered(stage, job)
+                else:
+                    await self._run_stage(stage, job)
+
+    async def _run_ordered(self, stage: Stage, job: _Job) -> None:
+        next_index = self._next_index.setdefault(job.episode.type, {})
+        async with self._ordered:
+            await self._ordered.wait_for(lambda: next_index.get(stage.name, 0) == job.index)
+        try:
+            if job.failed:
+                self._held.add(job.episode.type)
+            elif job.episode.type in self._held:
+                job.failed = True
+                self.failures.append(Failure(job.episode, stage.name))
+            await self._run_stage(stage, job)
+            # Also hold back when the ordered stage itself fails
+            if job.failed:
+                self._held.add(job.episode.type)
+        finally:
+            async with self._ordered:
+                next_index[stage.name] = job.index + 1
+                self._ordered.notify_all()
+
+    async def _run_stage(self, stage: Stage, job: _Job) -> None:
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            async with self._resources[stage.resource]:
+                if job.failed or self._abort.is_set():
+                    job.failed = True
+                    return
+
+                try:
+                    await loop.run_in_executor(self._executor, self._process, stage, job)
+                    return
+                except Exception as e:
+                    error = e
+                except BaseException as e:
+                    # SystemExit or KeyboardInterrupt from a stage stops the whole pipeline
+                    job.failed = True
+                    self._abort.set()
+                    if not self._error:
+                        self._error = e
+                    return
+
+            if not self.retry.should_retry(error, attempt):
+                job.failed = True
+                self.failures.append(Failure(job.episode, stage.name, error))
+                TealPrint.error(f"{stage.name} failed for {job.episode.title}, skipping it until the next run; {error}")
+                return
+
+            delay = self.retry.delay(attempt)
+            TealPrint.warning(f"{stage.name} failed for {job.episode.title}, retrying in {delay:.0f}s; {error}")
+            metrics.retry(stage.name, job.episode)
+            attempt += 1
+            try:
+                await asyncio.wait_for(self._abort.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _process(self, stage: Stage, job: _Job) -> None:
+        host = stage.host(job.episode) if stage.host else ""
+        with metrics.measure(stage.name, job.episode) as measurement:
+            self.retry.attempt(host, lambda: stage.func(job.episode))
+            if job.episode.file.is_file():
+                measurement.bytes = job.episode.file.stat().st_size
+
+    def _handle_sigint(self, loop: asyncio.AbstractEventLoop) -> None:
+        """The first SIGINT lets the running stages finish, the second one stops immediately.
+        The journal makes sure that the next run resumes the interrupted episodes."""
+
+        def on_sigint() -> None:
+            if self._abort.is_set():
+                # Threads can't be interrupted and the interpreter waits for them on exit
+                os._exit(130)
+
+            TealPrint.warning("Stopping after the running stages have finished, press Ctrl+C again to stop now")
+            self._abort.set()
+            if not self._error:
+                self._error = KeyboardInterrupt()
+
+        try:
+            loop.add_signal_handler(signal.SIGINT, on_sigint)
+        except (NotImplementedError, RuntimeError):
+            # Not supported on Windows or outside the main thread, Ctrl+C stops immediately then
+            pass
+
+    @staticmethod
+    def _remove_sigint_handler(loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError):
+            pass
@@ -0,0 +1,221 @@
+"""Offline benchmarks of the OPS listing, URL resolution, download, finalize and the whole pipeline.
+
+Runs against a local fixture server and fake media backends, so no network, browser or ffmpeg is needed.
+Usage: python -m opsdownloader.benchmark [--rounds 5] [--save baseline.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tealprint import TealConfig, TealLevel, TealPrint
+
+from ..app.app import App
+from ..config import config
+from ..core.episode import Episode
+from ..core.type import Types
+from ..gateways.catalog import Catalog
+from ..gateways.journal import Journal
+from ..gateways.ops_http import OPSHttp
+from ..gateways.plex import Plex
+from ..gateways.url_cache import UrlCache
+from ..utils.resilience import RetryPolicy
+from .fakes import FakeDownloader, FakeEncoder, FakeVerifier
+from .fixtures import FixtureServer
+
+
+class Result:
+    def __init__(self, name: str, times: List[float], bytes: int) -> None:
+        self.name = name
+        self.times = times
+        self.bytes = bytes
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+
+class Benchmark:
+    def __init__(self, server: FixtureServer, dir: Path, rounds: int, pipeline_episodes: int) -> None:
+        self.server = server
+        self.dir = dir
+        self.rounds = rounds
+        self.pipeline_episodes = pipeline_episodes
+        self.results: List[Result] = []
+        self._round = 0
+
+    def run(self) -> None:
+        self.measure("Parse library page", self._parse_library)
+        self.measure("Resolve download URLs", self._resolve_urls)
+        self.measure("Download", self._download, setup=self._resolved_episode, bytes=self.server.episode_size)
+        self.measure("Finalize", self._finalize, setup=self._downloaded_episode, bytes=self.server.episode_size)
+        self.measure(
+            "Run pipeline",
+            self._run_pipeline,
+            setup=self._new_episodes,
+            bytes=self.server.episode_size * self.pipeline_episodes,
+        )
+
+    def measure(self, name: str, func: Callable, setup: Optional[Callable] = None, bytes: int = 0) -> None:
+        """Run func once to warm up and then the number of rounds. Only func is timed, not setup"""
+        times: List[float] = []
+        for round in range(self.rounds + 1):
+            args = setup() if setup else None
+            started = time.perf_counter()
+            if setup:
+                func(args)
+            else:
+                func()
+            if round > 0:
+                times.append(time.perf_counter() - started)
+        self.results.append(Result(name, times, bytes))
+
+    def _round_dir(self, name: str) -> Path:
+        self._round += 1
+        dir = self.dir / f"{name}-{self._round}"
+        dir.mkdir(parents=True)
+        return dir
+
+    def _ops(self) -> OPSHttp:
+        ops = OPSHttp(base_url=self.server.url)
+        ops._vimeo_config_url = self.server.url + "/video/{}/config"
+        return ops
+
+    def _parse_library(self) -> None:
+        episodes = self._ops()._get_all_episodes_on_page(self.server.library.replace("{base}", self.server.url))
+        assert len(episodes) == len(self.server.episodes)
+
+    def _resolve_urls(self) -> None:
+        ops = self._ops()
+        for fake in self.server.episodes[:20]:
+            episode = Episode()
+            episode.ops.url = self.server.url + fake.path
+            ops.get_download_url(episode)
+            assert episode.ops.download_url.endswith(".mpd")
+        ops.close()
+
+    def _resolved_episode(self) -> Episode:
+        fake = self.server.episodes[-1]
+        episode = Episode()
+        episode.type = Types.QA
+        episode.title = fake.title
+        episode.number = self._round
+        episode.ops.number = fake.ops_number
+        episode.ops.download_url = f"{self.server.url}/master/{fake.video_id}.mpd"
+        return episode
+
+    def _download(self, episode: Episode) -> None:
+        FakeDownloader(self._round_dir("download")).download(episode)
+
+    def _downloaded_episode(self) -> Episode:
+        dir = self._round_dir("finalize")
+        episode = self._resolved_episode()
+        episode.file = dir / episode.filename.replace(".mp4", ".download.mp4")
+        with episode.file.open("wb") as file:
+            file.truncate(self.server.episode_size)
+        return episode
+
+    def _finalize(self, episode: Episode) -> None:
+        FakeEncoder().rerender(episode)
+        Plex(self.dir / "plex-finalize").move_episode(episode)
+
+    def _new_episodes(self) -> Tuple[Dict[Types, Episode], Dict[Types, List[Episode]]]:
+        latest_episodes: Dict[Types, Episode] = {}
+        for type in [Types.QA, Types.CLASS]:
+            latest = Episode()
+            latest.type = type
+            latest.season = datetime.now().year
+            latest.ops.number = self.server.episodes[-1].ops_number - self.pipeline_episodes
+            latest_episodes[type] = latest
+
+        episodes = self._ops()._get_all_episodes_on_page(self.server.library.replace("{base}", self.server.url))
+        catalog = Catalog(self.dir / "catalog.json")
+        numbers = [episode.ops.number for episode in episodes]
+        catalog.merge(episodes, min(numbers), max(numbers))
+        return latest_episodes, catalog.new_episodes(latest_episodes)
+
+    def _run_pipeline(self, episodes: Tuple[Dict[Types, Episode], Dict[Types, List[Episode]]]) -> None:
+        dir = self._round_dir("pipeline")
+
+        # Skip reading the user configuration and use the fake backends
+        app = App.__new__(App)
+        app.plex = Plex(dir / "plex")
+        app.downloader = FakeDownloader(dir / "scratch", workers=config.pipeline.download_workers)
+        app.encoder = FakeEncoder()
+        app.subtitler = None
+        app.verifier = FakeVerifier()
+        app.url_cache = UrlCache(dir / "url-cache.json")
+        app.journal = Journal(dir / "journal.jsonl")
+        app.retry = RetryPolicy()
+
+        ops = self._ops()
+        app._run_types(episodes[0], episodes[1], ops)
+        ops.close()
+
+
+def _print_results(results: List[Result]) -> None:
+    print(f"{'Benchmark':<24} {'Min s':>8} {'Median s':>9} {'Max s':>8} {'MiB/s':>8}")
+    for result in results:
+        speed = result.bytes / 1024**2 / result.median if result.bytes and result.median > 0 else 0
+        print(
+            f"{result.name:<24} {min(result.times):>8.4f} {result.median:>9.4f} {max(result.times):>8.4f} "
+            + (f"{speed:>8.1f}" if speed else f"{'':>8}")
+        )
+
+
+def _compare(results: List[Result], baseline_file: Path, threshold: float) -> bool:
+    """Returns true if any benchmark is slower than the baseline by more than the threshold"""
+    baseline: Dict[str, float] = json.loads(baseline_file.read_text())
+    regressed = False
+    for result in results:
+        if result.name not in baseline:
+            continue
+        change = result.median / baseline[result.name] - 1
+        if change > threshold:
+            TealPrint.warning(f"{result.name} is {change:.0%} slower than the baseline")
+            regressed = True
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m opsdownloader.benchmark", description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5, help="Number of timed rounds for each benchmark")
+    parser.add_argument("--episodes", type=int, default=500, help="Number of episodes in the library page")
+    parser.add_argument("--pipeline-episodes", type=int, default=8, help="Number of episodes run through the pipeline")
+    parser.add_argument("--segments", type=int, default=16, help="Number of segments for each episode")
+    parser.add_argument("--segment-size", type=int, default=1024**2, help="Size of each segment in bytes")
+    parser.add_argument("--save", type=Path, help="Save the median times as a baseline to this file")
+    parser.add_argument("--compare", type=Path, help="Fail if slower than the baseline in this file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown compared to the baseline")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print the log messages of the app")
+    args = parser.parse_args()
+
+    TealConfig.level = TealLevel.verbose if args.verbose else TealLevel.warning
+
+    with tempfile.TemporaryDirectory(prefix="ops-downloader-benchmark-") as tmp:
+        # Keep the caches, session and Plex index of the benchmark away from the real ones
+        os.environ["HOME"] = tmp
+        # The fake site is local, measure the app instead of the request rate limit
+        config.retry.host_rate = 0
+
+        with FixtureServer(args.episodes, args.segments, args.segment_size) as server:
+            benchmark = Benchmark(server, Path(tmp), max(1, args.rounds), args.pipeline_episodes)
+            benchmark.run()
+
+    _print_results(benchmark.results)
+
+    if args.save:
+        args.save.write_text(json.dumps({result.name: result.median for result in benchmark.results}, indent=2))
+    if args.compare and _compare(benchmark.results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import base64
+import json
+import re
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Any, Dict, List, Optional
+
+# Synthetic media is zeros, it's only the size that matters for the benchmarks
+_chunk = bytes(64 * 1024)
+_init_size = 1024
+
+
+class FakeEpisode:
+    def __init__(self, ops_number: float, title: str, op_type: str, video_id: int) -> None:
+        self.ops_number = ops_number
+        self.title = title
+        self.op_type = op_type
+        self.video_id = video_id
+
+    @property
+    def path(self) -> str:
+        return f"/episode/{self.video_id}"
+
+
+class FixtureServer:
+    """Local HTTP server that imitates the OPS site and the Vimeo player.
+
+    Routes:
+        /library                          Wix library page with all episodes in the page source
+        /episode/<id>                     Episode page with an embedded Vimeo player
+        /video/<id>/config                Vimeo player config pointing to the master.json
+        /master/<id>.json                 Vimeo master.json with a video and an audio stream
+        /segment/<id>/<stream>/<n>.m4s    Synthetic segment, audio segments are 1/8 of the video segments
+
+    Args:
+        episodes (int): Number of episodes in the library, every tenth is a Class, the rest Q&A
+        segments (int): Number of segments for each stream of an episode
+        segment_size (int): Size of each video segment in bytes
+    """
+
+    def __init__(self, episodes: int = 100, segments: int = 16, segment_size: int = 1024**2) -> None:
+        self.segments = segments
+        self.segment_size = segment_size
+        self.episodes: List[FakeEpisode] = []
+        for i in range(episodes):
+            op_type = "Class" if i % 10 == 0 else "Q&A"
+            self.episodes.append(FakeEpisode(float(i + 1), f"Episode {i + 1}: The Fake & The Real", op_type, 1000 + i))
+        self.library = self._library_page()
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[Thread] = None
+
+    @property
+    def url(self) -> str:
+        if not self._server:
+            raise RuntimeError("The fixture server hasn't been started")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def audio_segment_size(self) -> int:
+        return self.segment_size // 8
+
+    @property
+    def episode_size(self) -> int:
+        return 2 * _init_size + self.segments * (self.segment_size + self.audio_segment_size)
+
+    def start(self) -> None:
+        fixture = self
+
+        class Handler(_Handler):
+            server_fixture = fixture
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = Thread(target=self._server.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FixtureServer":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def find(self, video_id: int) -> Optional[FakeEpisode]:
+        index = video_id - 1000
+        if 0 <= index < len(self.episodes):
+            return self.episodes[index]
+        return None
+
+    def _library_page(self) -> str:
+        """Same structure as the warmup data that Wix puts in the page source"""
+        components: List[str] = []
+        for episode in reversed(self.episodes):
+            item = uuid.uuid4()
+            number = f"{episode.ops_number:g}"
+            components.append(f'"comp-title__{item}":{{"html":"<h6><span>{episode.title}<\\/span><\\/h6>"}}')
+            components.append(f'"comp-type__{item}":{{"html":"<p><span>{episode.op_type} {number}<\\/span><\\/p>"}}')
+            components.append(f'"comp-button__{item}":{{"link":{{"href":"{{base}}{episode.path}"}}}}')
+        return '<html><body><script type="application/json">{' + ",".join(components) + "}</script></body></html>"
+
+    def master_json(self, video_id: int) -> Dict[str, Any]:
+        init = base64.b64encode(bytes(_init_size)).decode()
+        master: Dict[str, Any] = {"clip_id": str(video_id), "base_url": f"../segment/{video_id}/"}
+        for stream, mime_type, size in [
+            ("video", "video/mp4", self.segment_size),
+            ("audio", "audio/mp4", self.audio_segment_size),
+        ]:
+            segments = [{"url": f"{i}.m4s", "size": size} for i in range(self.segments)]
+            representation = {"base_url": f"{stream}/", "mime_type": mime_type, "init_segment": init}
+            master[stream] = [{**representation, "bitrate": size, "height": 1080, "segments": segments}]
+        return master
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_fixture: FixtureServer
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, don't let them wait for a delayed ACK
+    disable_nagle_algorithm = True
+
+    _routes = [
+        ("library", re.compile(r"^/library$")),
+        ("episode", re.compile(r"^/episode/(\d+)$")),
+        ("config", re.compile(r"^/video/(\d+)/config$")),
+        ("master_json", re.compile(r"^/master/(\d+)\.json$")),
+        ("segment", re.compile(r"^/segment/(\d+)/(video|audio)/(\d+)\.m4s$")),
+    ]
+
+    def do_HEAD(self) -> None:
+        self._respond(head=True)
+
+    def do_GET(self) -> None:
+        self._respond(head=False)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _respond(self, head: bool) -> None:
+        path = self.path.split("?")[0]
+        if path == "/":
+            return self._send(b"<html><body><a href='/library'>Library</a></body></html>", "text/html", head)
+
+        for name, regexp in _Handler._routes:
+            match = regexp.match(path)
+            if match:
+                return getattr(self, f"_{name}")(match, head)
+        self.send_error(404)
+
+    def _library(self, match: re.Match, head: bool) -> None:
+        page = self.server_fixture.library.replace("{base}", self._base_url())
+        self._send(page.encode(), "text/html", head)
+
+    def _episode(self, match: re.Match, head: bool) -> None:
+        episode = self.server_fixture.find(int(match[1]))
+        if not episode:
+            return self.send_error(404)
+        page = f'<html><body><iframe src="https://player.vimeo.com/video/{episode.video_id}"></iframe></body></html>'
+        self._send(page.encode(), "text/html", head)
+
+    def _config(self, match: re.Match, head: bool) -> None:
+        url = f"{self._base_url()}/master/{match[1]}.json?base64_init=1"
+        body = {"request": {"files": {"dash": {"default_cdn": "fake", "cdns": {"fake": {"url": url}}}}}}
+        self._send(json.dumps(body).encode(), "application/json", head)
+
+    def _master_json(self, match: re.Match, head: bool) -> None:
+        body = json.dumps(self.server_fixture.master_json(int(match[1])))
+        self._send(body.encode(), "application/json", head)
+
+    def _segment(self, match: re.Match, head: bool) -> None:
+        fixture = self.server_fixture
+        size = fixture.segment_size if match[2] == "video" else fixture.audio_segment_size
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        if head:
+            return
+
+        while size > 0:
+            chunk = _chunk[: min(size, len(_chunk))]
+            self.wfile.write(chunk)
+            size -= len(chunk)
+
+    def _send(self, body: bytes, content_type: str, head: bool) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from argparse import Namespace
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from tealprint import TealConfig, TealLevel
 
@@ -17,7 +17,15 @@ class Config:
         self.app_name: str = _app_name
         self._general = General()
         self.ops = OPS()
+        self.pipeline = Pipeline()
+        self.downloader = Downloader()
+        self.retry = Retry()
+        self.subtitles = Subtitles()
+        self.daemon = Daemon()
         self.pretend = False
+        self.daemon_mode = False
+        self.profile = False
+        self.verify_library = False
 
     @property
     def general(self) -> General:
@@ -43,6 +51,9 @@ class Config:
         TealConfig.level = self._general.log_level
 
         self.pretend = args.pretend
+        self.profile = args.profile
+        self.verify_library = args.verify_library
+        self.daemon_mode = args.daemon
 
 
 class General:
@@ -50,12 +61,65 @@ class General:
         self.plex_dir: Path = Path("")
         self.log_level = TealLevel.info
         self.types: List[Types] = [Types.QA, Types.CLASS]
+        self.metrics_file: Optional[Path] = None
 
 
 class OPS:
     def __init__(self) -> None:
         self.email: str = ""
         self.password: str = ""
+        self.backend: str = "http"
+        self.wait_timeout: float = 15
+        self.poll_interval: float = 0.25
+        self.session_max_age: float = 168
+        self.resolvers: int = 2
+        self.url_cache_ttl: float = 1
+
+
+class Pipeline:
+    def __init__(self) -> None:
+        self.download_workers: int = 1
+        self.encode_workers: int = 2
+        self.verify_workers: int = 2
+        self.queue_size: int = 2
+
+
+class Downloader:
+    def __init__(self) -> None:
+        self.scratch_dir: Path = Path("")
+        self.bandwidth_limit: str = ""
+        self.host_connections: int = 2
+        self.single_pass: bool = True
+        self.native_dash: bool = True
+        self.segment_connections: int = 8
+
+
+class Retry:
+    def __init__(self) -> None:
+        self.attempts: int = 3
+        self.backoff: float = 2
+        self.max_backoff: float = 60
+        self.breaker_failures: int = 5
+        self.breaker_reset: float = 300
+        self.host_rate: float = 5
+        self.host_burst: int = 10
+
+
+class Subtitles:
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self.model: str = "small"
+        self.language: str = "en"
+        self.workers: int = 0
+
+
+class Daemon:
+    def __init__(self) -> None:
+        self.interval: float = 15
+        self.max_interval: float = 120
+        self.jitter: float = 0.1
+        self.status_host: str = "127.0.0.1"
+        self.status_port: int = 8765
 
 
 config = Config()
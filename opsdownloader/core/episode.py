@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 
@@ -10,6 +10,7 @@ class OPSEpisode:
     number: float = 0.0
     url: str = ""
     download_url: str = ""
+    duration: float = 0.0
 
     def previous_episode(self) -> float:
         """Get the previous episode number.
@@ -26,13 +27,19 @@ class OPSEpisode:
 class Episode:
     title: str = ""
     type: Types = Types.UNKNOWN
-    season: int = datetime.now().year
+    season: int = 0
     number: int = 0
-    ops: OPSEpisode = OPSEpisode()
+    ops: OPSEpisode = field(default_factory=OPSEpisode)
     file: Path = Path("")
+    # Set when subtitles have been generated, they are added to the file when it's rerendered
+    subtitles: Path = Path("")
+    # Set when the file has been verified
+    sha256: str = ""
+    duration: float = 0.0
 
     def __init__(self) -> None:
         self.ops = OPSEpisode()
+        self.season = datetime.now().year
 
     @property
     def filename(self) -> str:
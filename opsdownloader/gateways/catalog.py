@@ -0,0 +1,121 @@
+from bisect import bisect_right, insort
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import config
+from ..core.episode import Episode
+from ..core.type import Types
+from ..utils.files import load_json, save_json
+
+_version = 1
+
+# Several episodes can have the same number (e.g. Q&A 226c and 226d), the video page tells them apart
+_Key = Tuple[float, str]
+
+
+class CatalogEntry:
+    __slots__ = ["type", "ops_number", "title", "url"]
+
+    def __init__(self, type: Types, ops_number: float, title: str, url: str) -> None:
+        self.type = type
+        self.ops_number = ops_number
+        self.title = title
+        self.url = url
+
+    def to_episode(self) -> Episode:
+        episode = Episode()
+        episode.type = self.type
+        episode.title = self.title
+        episode.ops.number = self.ops_number
+        episode.ops.url = self.url
+        return episode
+
+
+class Catalog:
+    """All episodes that have been listed on the OPS site, sorted by type and number and cached on disk.
+
+    Keeps track of the range of numbers that has been listed completely. When a new listing overlaps
+    that range, episodes older than the listing can be taken from the catalog instead of searching
+    the site for them.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or Path.home().joinpath(f".{config.app_name}-catalog.json")
+        self._keys: Dict[Types, List[_Key]] = {}
+        self._entries: Dict[Tuple[Types, _Key], CatalogEntry] = {}
+        # All episodes numbered from complete_from to complete_to are in the catalog
+        self.complete_from = 0.0
+        self.complete_to = 0.0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, episode: Episode) -> None:
+        key = (float(episode.ops.number), episode.ops.url)
+        entry = self._entries.get((episode.type, key))
+        if entry:
+            entry.title = episode.title
+            return
+
+        self._entries[(episode.type, key)] = CatalogEntry(episode.type, key[0], episode.title, episode.ops.url)
+        insort(self._keys.setdefault(episode.type, []), key)
+
+    def merge(self, episodes: List[Episode], lowest: float, highest: float) -> None:
+        """Add a listing that contains all episodes numbered from lowest to highest"""
+        for episode in episodes:
+            self.add(episode)
+
+        if lowest <= self.complete_to and highest >= self.complete_from:
+            self.complete_from = min(self.complete_from, lowest)
+            self.complete_to = max(self.complete_to, highest)
+        elif highest > self.complete_to:
+            # Not connected to the earlier listings, only the newer listing is known to be complete
+            self.complete_from = lowest
+            self.complete_to = highest
+
+    def covers(self, latest_episodes: Dict[Types, Episode]) -> bool:
+        """If all episodes newer than the latest episodes, up to the newest listing, are in the catalog"""
+        if self.complete_to <= 0:
+            return False
+        return all(self.complete_from <= latest.ops.number for latest in latest_episodes.values())
+
+    def newer_than(self, type: Types, number: float) -> List[Episode]:
+        """Episodes of the type with a higher number, sorted by number"""
+        keys = self._keys.get(type, [])
+        start = bisect_right(keys, (number, "\uffff"))
+        return [self._entries[(type, key)].to_episode() for key in keys[start:]]
+
+    def new_episodes(self, latest_episodes: Dict[Types, Episode]) -> Dict[Types, List[Episode]]:
+        return {type: self.newer_than(type, latest.ops.number) for type, latest in latest_episodes.items()}
+
+    def save(self) -> None:
+        data = {
+            "complete_from": self.complete_from,
+            "complete_to": self.complete_to,
+            "episodes": [
+                [entry.type.value, entry.ops_number, entry.title, entry.url] for entry in self._entries.values()
+            ],
+        }
+        save_json(self.path, data, "episode catalog", _version)
+
+    def _load(self) -> None:
+        catalog = load_json(self.path, "episode catalog", Catalog._parse, _version)
+        if catalog:
+            self._keys, self._entries, self.complete_from, self.complete_to = catalog
+
+    @staticmethod
+    def _parse(
+        data: Any,
+    ) -> Tuple[Dict[Types, List[_Key]], Dict[Tuple[Types, _Key], CatalogEntry], float, float]:
+        keys: Dict[Types, List[_Key]] = {}
+        entries: Dict[Tuple[Types, _Key], CatalogEntry] = {}
+        for type_value, ops_number, title, url in data["episodes"]:
+            type = Types(type_value)
+            key = (float(ops_number), url)
+            entries[(type, key)] = CatalogEntry(type, key[0], title, url)
+            keys.setdefault(type, []).append(key)
+        for type_keys in keys.values():
+            type_keys.sort()
+
+        return keys, entries, float(data["complete_from"]), float(data["complete_to"])
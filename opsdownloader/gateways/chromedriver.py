@@ -0,0 +1,49 @@
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional
+
+import chromedriver_autoinstaller
+from tealprint import TealPrint
+
+from ..config import config
+from ..utils.files import load_json, save_json
+
+_lock = Lock()
+_installed: Optional[str] = None
+
+
+def install() -> Optional[str]:
+    """Get the path to a chromedriver that matches the installed Chrome.
+
+    chromedriver_autoinstaller checks the latest driver online every time it's called, so the path is
+    stored on disk for each Chrome version and only looked up again when Chrome has been updated.
+    """
+    global _installed
+
+    with _lock:
+        if _installed:
+            return _installed
+
+        cache_file = Path.home().joinpath(f".{config.app_name}-chromedriver.json")
+        chrome_version = chromedriver_autoinstaller.get_chrome_version()
+
+        cache = _load(cache_file)
+        path = cache.get(chrome_version or "")
+        if path and Path(path).is_file():
+            TealPrint.debug(f"Using cached chromedriver {path}")
+        else:
+            path = chromedriver_autoinstaller.install()
+            if path and chrome_version:
+                cache[chrome_version] = str(path)
+                _save(cache_file, cache)
+
+        _installed = str(path) if path else None
+        return _installed
+
+
+def _load(cache_file: Path) -> Dict[str, str]:
+    return load_json(cache_file, "chromedriver path", lambda cache: cache if isinstance(cache, dict) else None) or {}
+
+
+def _save(cache_file: Path, cache: Dict[str, str]) -> None:
+    save_json(cache_file, cache, "chromedriver path")
@@ -4,10 +4,10 @@ from pathlib import Path
 from subprocess import run
 from typing import List
 
-from blulib.config_parser import ConfigParser
+from blulib.config_parser import ConfigParser, SectionNotFoundError
 from tealprint import TealPrint
 
-from ..config import OPS, General, config
+from ..config import OPS, Daemon, Downloader, General, Pipeline, Retry, Subtitles, config
 from ..core.type import Types
 
 
@@ -40,11 +40,13 @@ class ConfigGateway:
     def get_general(self) -> General:
         general = General()
 
-        self.parser.to_object(general, "General", "plex_dir", "log_level", "str_list:types")
+        self.parser.to_object(general, "General", "plex_dir", "log_level", "str_list:types", "metrics_file")
 
         if not general.plex_dir:
             TealPrint.warning("Missing 'plex_dir' under section [General] in your configuration", exit=True)
         general.plex_dir = Path(str(general.plex_dir))
+        if general.metrics_file:
+            general.metrics_file = Path(str(general.metrics_file))
 
         if not general.types:
             general.types = [Types.QA, Types.CLASS]
@@ -60,11 +62,116 @@ class ConfigGateway:
     def get_ops(self) -> OPS:
         ops = OPS()
 
-        self.parser.to_object(ops, "OPS", "email", "password")
+        self.parser.to_object(
+            ops,
+            "OPS",
+            "email",
+            "password",
+            "backend",
+            "float:wait_timeout",
+            "float:poll_interval",
+            "float:session_max_age",
+            "int:resolvers",
+            "float:url_cache_ttl",
+        )
 
         if not ops.email:
             TealPrint.warning("Missing 'email' under section [OPS] in your configuration", exit=True)
         if not ops.password:
             TealPrint.warning("Missing 'password' under section [OPS] in your configuration", exit=True)
+        if ops.backend not in ["http", "selenium"]:
+            TealPrint.warning("'backend' under section [OPS] has to be either 'http' or 'selenium'", exit=True)
 
         return ops
+
+    def get_pipeline(self) -> Pipeline:
+        pipeline = Pipeline()
+
+        try:
+            self.parser.to_object(
+                pipeline,
+                "Pipeline",
+                "int:download_workers",
+                "int:encode_workers",
+                "int:verify_workers",
+                "int:queue_size",
+            )
+        except SectionNotFoundError:
+            pass
+
+        return pipeline
+
+    def get_downloader(self) -> Downloader:
+        downloader = Downloader()
+
+        try:
+            self.parser.to_object(
+                downloader,
+                "Downloader",
+                "scratch_dir",
+                "bandwidth_limit",
+                "int:host_connections",
+                "bool:single_pass",
+                "bool:native_dash",
+                "int:segment_connections",
+            )
+        except SectionNotFoundError:
+            pass
+        downloader.scratch_dir = Path(str(downloader.scratch_dir))
+
+        return downloader
+
+    def get_retry(self) -> Retry:
+        retry = Retry()
+
+        try:
+            self.parser.to_object(
+                retry,
+                "Retry",
+                "int:attempts",
+                "float:backoff",
+                "float:max_backoff",
+                "int:breaker_failures",
+                "float:breaker_reset",
+                "float:host_rate",
+                "int:host_burst",
+            )
+        except SectionNotFoundError:
+            pass
+
+        return retry
+
+    def get_subtitles(self) -> Subtitles:
+        subtitles = Subtitles()
+
+        try:
+            self.parser.to_object(
+                subtitles,
+                "Subtitles",
+                "bool:enabled",
+                "model",
+                "language",
+                "int:workers",
+            )
+        except SectionNotFoundError:
+            pass
+
+        return subtitles
+
+    def get_daemon(self) -> Daemon:
+        daemon = Daemon()
+
+        try:
+            self.parser.to_object(
+                daemon,
+                "Daemon",
+                "float:interval",
+                "float:max_interval",
+                "float:jitter",
+                "status_host",
+                "int:status_port",
+            )
+        except SectionNotFoundError:
+            pass
+
+        return daemon
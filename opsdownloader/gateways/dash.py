@@ -0,0 +1,239 @@
+import base64
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from tealprint import TealPrint
+from urllib3.exceptions import HTTPError
+
+from ..utils.resilience import backoff_delay
+
+_request_timeout = 30
+
+
+class Segment:
+    __slots__ = ("url", "size", "offset")
+
+    def __init__(self, url: str, size: int, offset: int) -> None:
+        self.url = url
+        self.size = size
+        self.offset = offset
+
+
+class Representation:
+    """One video or audio stream of the manifest. Segments have a known size so they can be written
+    at their offset in the output file in any order"""
+
+    def __init__(self, data: Dict[str, Any], base_url: str) -> None:
+        self.mime_type: str = data.get("mime_type", "")
+        self.bitrate: int = data.get("avg_bitrate") or data.get("bitrate") or 0
+        self.height: int = data.get("height") or 0
+        segments = data["segments"]
+        self.duration = float(data.get("duration") or (segments[-1].get("end", 0) if segments else 0))
+        self.init = base64.b64decode(data["init_segment"]) if data.get("init_segment") else b""
+
+        url = urljoin(base_url, data.get("base_url", ""))
+        offset = len(self.init)
+        self.segments: List[Segment] = []
+        for segment in segments:
+            self.segments.append(Segment(urljoin(url, segment["url"]), int(segment["size"]), offset))
+            offset += int(segment["size"])
+        self.size = offset
+
+
+class Manifest:
+    """Vimeo master.json which lists all streams and their segments"""
+
+    def __init__(self, master_url: str, data: Dict[str, Any]) -> None:
+        base_url = urljoin(master_url, data.get("base_url", ""))
+        self.video = [Representation(video, base_url) for video in data.get("video", [])]
+        self.audio = [Representation(audio, base_url) for audio in data.get("audio", [])]
+
+    def best_video(self) -> Optional[Representation]:
+        """Same as the 'bestvideo[ext=mp4]' format selector"""
+        videos = [video for video in self.video if video.mime_type == "video/mp4"]
+        return max(videos, key=lambda video: (video.height, video.bitrate), default=None)
+
+    def best_audio(self) -> Optional[Representation]:
+        """Same as the 'bestaudio[ext=m4a]' format selector"""
+        audios = [audio for audio in self.audio if audio.mime_type == "audio/mp4"]
+        return max(audios, key=lambda audio: audio.bitrate, default=None)
+
+
+class DashFetcher:
+    """Downloads the segments of DASH streams concurrently into preallocated files.
+
+    Segments are fetched over a pool of keep-alive connections and written directly at their offset.
+    Finished segments are recorded next to the output file so an interrupted download only fetches
+    the missing segments when it's resumed.
+
+    Args:
+        connections (int): Number of segments that are fetched at the same time
+        retries (int): How many times a segment is retried before the download fails
+        rate_limit (int): Max bytes per second for all downloads of this fetcher, 0 means no limit
+    """
+
+    def __init__(self, connections: int = 8, retries: int = 3, rate_limit: int = 0) -> None:
+        self.connections = max(1, connections)
+        self.retries = retries
+        self.rate_limit = rate_limit
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.connections, pool_maxsize=self.connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._rate_lock = Lock()
+        self._rate_next = 0.0
+
+    def get_manifest(self, download_url: str) -> Optional[Manifest]:
+        """Get the master.json of a download URL, returns None if it's not a Vimeo style manifest"""
+        master_url = DashFetcher._mpd_to_master_json(download_url)
+        if not master_url:
+            return None
+
+        try:
+            response = self.session.get(master_url, timeout=_request_timeout)
+            response.raise_for_status()
+            return Manifest(response.url, response.json())
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            TealPrint.verbose(f"Could not read DASH manifest {master_url}; {e}")
+            return None
+
+    def fetch(self, download_url: str, tmp_dir: Path) -> Optional[Tuple[Path, Path, float]]:
+        """Download the best video and audio streams.
+
+        Returns:
+            The video and audio file and the duration of the video in seconds,
+            or None if the download URL isn't supported
+        """
+        manifest = self.get_manifest(download_url)
+        if not manifest:
+            return None
+
+        video = manifest.best_video()
+        audio = manifest.best_audio()
+        if not video or not audio:
+            return None
+
+        TealPrint.verbose(
+            f"Downloading {len(video.segments)} video and {len(audio.segments)} audio segments, "
+            + f"{(video.size + audio.size) / 1024**2:.0f} MiB"
+        )
+        video_file = tmp_dir / "video.mp4"
+        audio_file = tmp_dir / "audio.m4a"
+        self.fetch_representation(video, video_file)
+        self.fetch_representation(audio, audio_file)
+        return video_file, audio_file, video.duration
+
+    def fetch_representation(self, representation: Representation, file: Path) -> None:
+        progress_file = file.with_name(f"{file.name}.done")
+        done = DashFetcher._load_progress(progress_file, file, representation.size)
+
+        fd = os.open(file, os.O_RDWR | os.O_CREAT)
+        try:
+            DashFetcher._preallocate(fd, representation.size)
+            DashFetcher._write_at(fd, representation.init, 0)
+
+            segments = [(i, segment) for i, segment in enumerate(representation.segments) if i not in done]
+            progress_lock = Lock()
+            with progress_file.open("a") as progress:
+
+                def fetch_segment(item: Tuple[int, Segment]) -> None:
+                    i, segment = item
+                    DashFetcher._write_at(fd, self._get_segment(segment), segment.offset)
+                    with progress_lock:
+                        progress.write(f"{i}\n")
+
+                with ThreadPoolExecutor(self.connections, thread_name_prefix="segment") as executor:
+                    # Consume the iterator so that exceptions from the segments are raised
+                    for _ in executor.map(fetch_segment, segments):
+                        pass
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        progress_file.unlink()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _get_segment(self, segment: Segment) -> bytes:
+        for attempt in range(self.retries):
+            try:
+                return self._get_segment_once(segment)
+            except requests.RequestException as e:
+                TealPrint.verbose(f"Retrying segment {segment.url}; {e}")
+                time.sleep(backoff_delay(attempt, 1, 10))
+        return self._get_segment_once(segment)
+
+    def _get_segment_once(self, segment: Segment) -> bytes:
+        with self.session.get(segment.url, timeout=_request_timeout, stream=True) as response:
+            response.raise_for_status()
+            # Read the whole segment at once, much faster than the small chunks of response.content
+            try:
+                data = response.raw.read(decode_content=True)
+            except HTTPError as e:
+                raise requests.RequestException(e)
+        if len(data) != segment.size:
+            raise requests.RequestException(f"Expected {segment.size} bytes but got {len(data)}")
+        self._throttle(segment.size)
+        return data
+
+    def _throttle(self, size: int) -> None:
+        """Every segment reserves the time it takes to transfer it at the rate limit, sleep until it's our turn"""
+        if not self.rate_limit:
+            return
+
+        with self._rate_lock:
+            now = time.time()
+            wait = self._rate_next - now
+            self._rate_next = max(now, self._rate_next) + size / self.rate_limit
+        if wait > 0:
+            time.sleep(wait)
+
+    @staticmethod
+    def _mpd_to_master_json(download_url: str) -> Optional[str]:
+        if ".mpd?" in download_url:
+            return download_url.replace(".mpd?", ".json?base64_init=1&")
+        if download_url.endswith(".mpd"):
+            return download_url[:-4] + ".json?base64_init=1"
+        return None
+
+    @staticmethod
+    def _load_progress(progress_file: Path, file: Path, size: int) -> Set[int]:
+        """Segments that are already downloaded from an earlier run"""
+        if not progress_file.exists() or not file.exists() or file.stat().st_size != size:
+            progress_file.unlink(missing_ok=True)
+            return set()
+
+        done: Set[int] = set()
+        for line in progress_file.read_text().splitlines():
+            if line.isdigit():
+                done.add(int(line))
+        if done:
+            TealPrint.verbose(f"Resuming {file.name}, {len(done)} segments are already downloaded")
+        return done
+
+    @staticmethod
+    def _preallocate(fd: int, size: int) -> None:
+        os.truncate(fd, size)
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except OSError:
+                # Not supported by all filesystems, the file is sparse then
+                pass
+
+    @staticmethod
+    def _write_at(fd: int, data: bytes, offset: int) -> None:
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
@@ -1,8 +1,15 @@
+import hashlib
+import shutil
 from pathlib import Path
+from threading import Lock, Semaphore
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
 
-from yt_dlp import YoutubeDL
+import requests
+from tealprint import TealPrint
 
 from ..core.episode import Episode
+from .dash import DashFetcher
 
 
 class Downloader:
@@ -12,16 +19,161 @@ class Downloader:
         "format": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]",  # Set the format for the streams
     }
 
-    def __init__(self) -> None:
-        pass
+    def __init__(
+        self,
+        scratch_dir: Path = Path(""),
+        workers: int = 1,
+        bandwidth_limit: str = "",
+        host_connections: int = 2,
+        single_pass: bool = True,
+        native_dash: bool = True,
+        segment_connections: int = 8,
+    ) -> None:
+        """
+        Args:
+            scratch_dir (Path): Directory where downloads are stored until they are moved to Plex
+            workers (int): Number of downloads that can run at the same time
+            bandwidth_limit (str): Total download rate for all downloads, e.g. 10M. Empty means no limit
+            host_connections (int): Max number of downloads from the same host at the same time
+            single_pass (bool): Set the title and final container when the streams are merged, so that
+                the episode doesn't have to be rerendered afterwards
+            native_dash (bool): Download Vimeo DASH streams with the built-in segment fetcher, yt-dlp is
+                used for everything else and when the built-in fetcher fails
+            segment_connections (int): Number of segments the built-in fetcher downloads at the same time
+        """
+        self.scratch_dir = scratch_dir
+        self.single_pass = single_pass
+        self.workers = max(1, workers)
+        self.host_connections = max(1, host_connections)
+
+        # Split the global limit between all workers so the total never exceeds it
+        self.rate_limit = 0
+        limit = Downloader._parse_bytes(bandwidth_limit)
+        if limit:
+            self.rate_limit = limit // self.workers
+
+        # The built-in fetcher is shared by all workers and limits the total rate itself
+        self.dash: Optional[DashFetcher] = None
+        if native_dash:
+            self.dash = DashFetcher(connections=segment_connections, rate_limit=int(limit or 0))
+
+        self._hosts: Dict[str, Semaphore] = {}
+        self._hosts_lock = Lock()
 
     def download(self, episode: Episode) -> None:
-        yt = YoutubeDL(Downloader.opts)
-        yt.download([episode.ops.download_url])
-        episode.file = Downloader._rename_file(episode)
+        # Same directory for the same episode so that an interrupted download is resumed by the next run.
+        # Several episodes can have the same number (e.g. Q&A 225a and 225b), the video page tells them apart
+        url_hash = hashlib.sha1(episode.ops.url.encode()).hexdigest()[:8]
+        tmp_dir = self.scratch_dir / f"tmp-{episode.type.name}-{episode.ops.number}-{url_hash}"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        with self._host_slot(episode.ops.download_url):
+            if self._download_native(episode, tmp_dir):
+                final = self.single_pass
+            else:
+                final = self._download_yt_dlp(episode, tmp_dir)
+        episode.file = self._rename_file(episode, tmp_dir, final)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _download_native(self, episode: Episode, tmp_dir: Path) -> bool:
+        """Download the segments with the built-in fetcher and merge them into tmp.mp4
+
+        Returns:
+            False if the built-in fetcher can't download the episode
+        """
+        if not self.dash:
+            return False
+
+        try:
+            files = self.dash.fetch(episode.ops.download_url, tmp_dir)
+        except (requests.RequestException, OSError) as e:
+            TealPrint.warning(f"Built-in download failed, trying again with yt-dlp; {e}")
+            return False
+        if not files:
+            return False
+
+        video_file, audio_file, episode.ops.duration = files
+        self._merge(episode, video_file, audio_file, tmp_dir / "tmp.mp4")
+        video_file.unlink()
+        audio_file.unlink()
+        return True
+
+    def _merge(self, episode: Episode, video_file: Path, audio_file: Path, out_file: Path) -> None:
+        import ffmpeg
+
+        metadata = {"metadata": f"title={episode.title}"} if self.single_pass else {}
+        stream = ffmpeg.output(
+            ffmpeg.input(str(video_file)),
+            ffmpeg.input(str(audio_file)),
+            str(out_file),
+            vcodec="copy",
+            acodec="copy",
+            **metadata,
+        )
+        stream.overwrite_output().run(quiet=True)
+
+    def _download_yt_dlp(self, episode: Episode, tmp_dir: Path) -> bool:
+        """
+        Returns:
+            True if the title and container were set when merging the streams
+        """
+        merged: List[bool] = []
+
+        def on_postprocess(status: Dict[str, Any]) -> None:
+            if status["postprocessor"] == "Merger" and status["status"] == "finished":
+                merged.append(True)
+
+        # yt-dlp loads all its extractors when imported, only import it when it's needed
+        from yt_dlp import YoutubeDL
+
+        yt = YoutubeDL(self._get_opts(tmp_dir, episode, on_postprocess))
+        info = yt.extract_info(episode.ops.download_url)
+        episode.ops.duration = float(info.get("duration") or 0) if info else 0
+        return self.single_pass and len(merged) > 0
+
+    def _get_opts(self, tmp_dir: Path, episode: Episode, on_postprocess: Callable[[Dict[str, Any]], None]) -> Dict:
+        opts = dict(Downloader.opts)
+        opts["outtmpl"] = str(tmp_dir / Downloader.opts["outtmpl"])
+        opts["continuedl"] = True  # Resume partially downloaded files and fragments
+        if self.rate_limit:
+            opts["ratelimit"] = self.rate_limit
+        if self.single_pass:
+            # Merge directly into the final container with the correct title
+            opts["merge_output_format"] = "mp4"
+            opts["postprocessor_args"] = {"merger+ffmpeg_o": ["-metadata", f"title={episode.title}"]}
+            opts["postprocessor_hooks"] = [on_postprocess]
+        return opts
 
     @staticmethod
-    def _rename_file(episode: Episode) -> Path:
-        new_name = episode.filename.replace(".mp4", ".mkv")
-        file = Path("tmp.mkv")
-        return file.rename(new_name)
+    def _parse_bytes(size: str) -> Optional[int]:
+        """Parse sizes like 500K or 10M, the same way as yt-dlp"""
+        if not size:
+            return None
+
+        from yt_dlp.utils import parse_bytes
+
+        return parse_bytes(size)
+
+    def _host_slot(self, url: str) -> Semaphore:
+        host = urlparse(url).hostname or ""
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = Semaphore(self.host_connections)
+            return self._hosts[host]
+
+    def _rename_file(self, episode: Episode, tmp_dir: Path, final: bool) -> Path:
+        """Move the downloaded file out of the temporary directory.
+
+        Args:
+            final (bool): If the file already has the correct title and container. Otherwise it gets
+                an intermediate name and has to be rerendered.
+        """
+        files = [file for file in tmp_dir.glob("tmp.*") if file.suffix in [".mp4", ".mkv"]]
+        if len(files) != 1:
+            raise FileNotFoundError(f"Could not find the downloaded file in {tmp_dir}")
+        file = files[0]
+
+        new_name = episode.filename
+        if not final:
+            new_name = episode.filename.replace(".mp4", f".download{file.suffix}")
+        return file.rename(self.scratch_dir / new_name)
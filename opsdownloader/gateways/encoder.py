@@ -1,7 +1,3 @@
-from pathlib import Path
-
-import ffmpeg
-
 from ..core.episode import Episode
 
 
@@ -12,20 +8,32 @@ class Encoder:
     def rerender(self, episode: Episode) -> None:
         in_file = episode.file
 
-        out_file = episode.filename
-        stream = ffmpeg.input(episode.file)
+        # Title and container were already set when downloading
+        if in_file.name == episode.filename:
+            return
+
+        import ffmpeg
+
+        out_file = in_file.with_name(episode.filename)
+        streams = [ffmpeg.input(episode.file)]
+        subtitles = {}
+        # Add the subtitles in the same pass as the title
+        if episode.subtitles.name:
+            streams.append(ffmpeg.input(episode.subtitles))
+            subtitles = {"scodec": "mov_text"}
         stream = ffmpeg.output(
-            stream,
+            *streams,
             out_file,
             vcodec="copy",
             acodec="copy",
             metadata=f"title={episode.title}",
+            **subtitles,
         )
-        stream.run()
+        stream.overwrite_output().run()
 
         # Delete the infile
         in_file.unlink(missing_ok=True)
 
-        episode.file = Path(out_file)
+        episode.file = out_file
 
         pass
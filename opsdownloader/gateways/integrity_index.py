@@ -0,0 +1,79 @@
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from ..config import config
+from ..utils.files import load_json, save_json
+
+_version = 1
+
+
+class IntegrityEntry:
+    __slots__ = ["size", "mtime", "sha256", "duration", "ok"]
+
+    def __init__(self, size: int, mtime: float, sha256: str, duration: float, ok: bool) -> None:
+        self.size = size
+        self.mtime = mtime
+        self.sha256 = sha256
+        self.duration = duration
+        self.ok = ok
+
+
+class IntegrityIndex:
+    """Hash, duration and verification result of every episode in the Plex library.
+
+    Stored in the library itself so it follows the library. Entries are keyed by the path relative
+    to the library and are only verified again when the size or mtime of the file has changed.
+    """
+
+    def __init__(self, dir: Path, path: Optional[Path] = None) -> None:
+        self.dir = dir
+        self.path = path or dir.joinpath(f".{config.app_name}-integrity.json")
+        self._entries: Dict[str, IntegrityEntry] = {}
+        self._lock = Lock()
+        self._load()
+
+    def get(self, file: Path) -> Optional[IntegrityEntry]:
+        """Get the entry of a file if the file hasn't changed since it was verified"""
+        with self._lock:
+            entry = self._entries.get(self._key(file))
+        if not entry:
+            return None
+
+        try:
+            stat = file.stat()
+        except OSError:
+            return None
+        if stat.st_size != entry.size or stat.st_mtime != entry.mtime:
+            return None
+        return entry
+
+    def add(self, file: Path, sha256: str, duration: float, ok: bool = True) -> None:
+        stat = file.stat()
+        with self._lock:
+            self._entries[self._key(file)] = IntegrityEntry(stat.st_size, stat.st_mtime, sha256, duration, ok)
+
+    def remove_missing(self) -> None:
+        with self._lock:
+            self._entries = {key: entry for key, entry in self._entries.items() if self.dir.joinpath(key).is_file()}
+
+    def save(self) -> None:
+        # Held while writing as well, episodes of different types are moved to Plex at the same time
+        with self._lock:
+            data = {
+                "files": {
+                    key: [entry.size, entry.mtime, entry.sha256, entry.duration, entry.ok]
+                    for key, entry in self._entries.items()
+                },
+            }
+            save_json(self.path, data, "integrity index", _version)
+
+    def _load(self) -> None:
+        self._entries = load_json(self.path, "integrity index", IntegrityIndex._parse, _version) or {}
+
+    @staticmethod
+    def _parse(data: Any) -> Dict[str, IntegrityEntry]:
+        return {key: IntegrityEntry(file[0], file[1], file[2], file[3], file[4]) for key, file in data["files"].items()}
+
+    def _key(self, file: Path) -> str:
+        return file.relative_to(self.dir).as_posix()
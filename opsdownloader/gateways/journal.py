@@ -0,0 +1,99 @@
+import json
+import os
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict
+
+from tealprint import TealPrint
+
+from ..core.episode import Episode
+from ..utils.files import write_atomic
+
+stages = ["download", "subtitles", "rerender", "move"]
+# Stages after which the downloaded or rerendered file is needed to continue
+_file_stages = ["download", "subtitles", "rerender"]
+
+
+class Journal:
+    """Append-only JSONL journal of which stages have been completed for each episode.
+
+    Every line is a snapshot of the episode after a stage has completed. A run that crashes
+    can then resume from the last completed stage instead of starting over. A partially
+    written last line (from a crash while writing) is ignored.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        # Keyed by the video page, several episodes can have the same number (e.g. Q&A 225a and 225b)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+        self._load()
+
+    def restore(self, episode: Episode, stage: str) -> bool:
+        """Restore the episode from the journal if the stage has already been completed.
+
+        Returns:
+            True if the stage is done and can be skipped
+        """
+        job = self._jobs.get(Journal._key(episode))
+        if not job or stages.index(job["stage"]) < stages.index(stage):
+            return False
+
+        # The file has to still exist to be able to skip the stage
+        file = Path(job["file"])
+        if job["stage"] in _file_stages and not file.exists():
+            return False
+
+        subtitles = Path(job.get("subtitles", ""))
+        if job["stage"] == "subtitles" and not subtitles.is_file():
+            return False
+
+        episode.ops.download_url = job["download_url"]
+        episode.ops.duration = job.get("duration", 0.0)
+        episode.file = file
+        episode.subtitles = subtitles
+        return True
+
+    def record(self, episode: Episode, stage: str) -> None:
+        job = {
+            "type": episode.type.value,
+            "ops": episode.ops.number,
+            "url": episode.ops.url,
+            "stage": stage,
+            "download_url": episode.ops.download_url,
+            "duration": episode.ops.duration,
+            "file": str(episode.file),
+            "subtitles": str(episode.subtitles) if episode.subtitles.name else "",
+        }
+
+        with self._lock:
+            self._jobs[Journal._key(episode)] = job
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a") as file:
+                file.write(json.dumps(job) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+
+        with self.path.open() as file:
+            for line in file:
+                try:
+                    job = json.loads(line)
+                    if job["stage"] in stages:
+                        self._jobs[job["url"]] = job
+                except (ValueError, KeyError):
+                    TealPrint.verbose(f"Skipping invalid line in journal {self.path}")
+
+        # Compact the journal by only keeping unfinished jobs
+        self._jobs = {key: job for key, job in self._jobs.items() if job["stage"] != stages[-1]}
+        if self._jobs:
+            TealPrint.info(f"Resuming {len(self._jobs)} unfinished episodes from the last run")
+
+        write_atomic(self.path, "".join(json.dumps(job) + "\n" for job in self._jobs.values()))
+
+    @staticmethod
+    def _key(episode: Episode) -> str:
+        return episode.ops.url
@@ -0,0 +1,65 @@
+import json
+from collections import OrderedDict
+from typing import List, Optional
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+
+class NetworkCollector:
+    """Collects master.json requests from the Chrome performance log.
+
+    Chrome only returns new log entries for each get_log() call, so the log is drained
+    incrementally and only Network.requestWillBeSent events for master.json are parsed.
+    Requests are indexed by the document (e.g. the player iframe) that sent them, and
+    everything seen since the last new_page() belongs to the page that is currently open.
+    """
+
+    def __init__(self, driver: WebDriver, max_entries: int = 64) -> None:
+        self.driver = driver
+        self.max_entries = max_entries
+        self._by_document: "OrderedDict[str, str]" = OrderedDict()
+        self._page_masters: List[str] = []
+
+    def new_page(self) -> None:
+        """Call before opening a new page. Requests logged before this are not attributed to the new page"""
+        self.drain()
+        self._page_masters = []
+
+    def drain(self) -> None:
+        for entry in self.driver.get_log("performance"):
+            message: str = entry["message"]
+
+            # Skip most messages without parsing the JSON
+            if "master.json" not in message or "Network.requestWillBeSent" not in message:
+                continue
+
+            event = json.loads(message)["message"]
+            if event["method"] != "Network.requestWillBeSent":
+                continue
+
+            params = event["params"]
+            url = params["request"]["url"]
+            if not url or "master.json" not in url:
+                continue
+
+            self._add(params.get("documentURL", ""), url)
+
+    def master_json(self, document_url: Optional[str] = None) -> Optional[str]:
+        """Get the master.json URL requested by document_url, or else the first one requested by the current page"""
+        self.drain()
+
+        if document_url and document_url in self._by_document:
+            return self._by_document[document_url]
+        if self._page_masters:
+            return self._page_masters[0]
+        return None
+
+    def _add(self, document_url: str, url: str) -> None:
+        if url not in self._page_masters:
+            self._page_masters.append(url)
+
+        if document_url:
+            self._by_document[document_url] = url
+            self._by_document.move_to_end(document_url)
+            while len(self._by_document) > self.max_entries:
+                self._by_document.popitem(last=False)
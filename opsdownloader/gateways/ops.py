@@ -1,14 +1,9 @@
 import json
-import re
-import time
-from pathlib import Path
-from time import sleep
-from typing import Any, List, Optional, Set
+from typing import Any, Dict, List, Optional
 
-import chromedriver_autoinstaller
 from colored import attr, fg
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -20,19 +15,42 @@ from tealprint import TealPrint
 from ..config import config
 from ..core.episode import Episode
 from ..core.type import Types
-
-sleep_time = 0.5
-page_load_time = 5
-get_element_timeout = 15
-
-
-class OPS:
-    _base_url = "https://www.objectivepersonalitysystem.com"
-    _episode_regexp = re.compile(r"([\w&]+) (\d+\.?\d?).*")
-
-    def __init__(self) -> None:
-        path = chromedriver_autoinstaller.install()
-        if not Path:
+from ..utils.resilience import TransientError, rate_limiter
+from . import chromedriver
+from .catalog import Catalog
+from .network_collector import NetworkCollector
+from .ops_base import OPSBase
+from .session_store import SessionStore
+from .waits import Waits, element_gone, element_present, list_items_changed, request_observed
+
+_list_items_xpath = ".//div[contains(@role,'listitem')]"
+_list_items_css = "div[role*='listitem']"
+# Max number of episodes shown in the list
+_page_size = 20
+_login_button_xpath = ".//*[contains(text(), 'Log In')]"
+_no_results_locator = (By.XPATH, ".//*[contains(text(), 'No results') or contains(text(), 'No items')]")
+
+_get_list_items_script = """
+return Array.from(document.querySelectorAll(arguments[0])).map(item => {
+    const link = item.querySelector("a");
+    return {
+        spans: Array.from(item.querySelectorAll("p[class*='font_8'] > span")).map(span => span.innerText),
+        href: link ? link.href : null,
+    };
+});
+"""
+_get_local_storage_script = "return Object.assign({}, window.localStorage);"
+_set_local_storage_script = """
+for (const [key, value] of Object.entries(arguments[0])) {
+    window.localStorage.setItem(key, value);
+}
+"""
+
+
+class OPS(OPSBase):
+    def __init__(self, debugging_port: int = 9222) -> None:
+        path = chromedriver.install()
+        if not path:
             TealPrint.error("Could not download chromedriver", exit=True)
             return
 
@@ -42,219 +60,277 @@ class OPS:
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-gpu")
         options.add_argument("--lang=en-us")
-        options.add_argument("--remote-debugging-port=9222")
+        options.add_argument(f"--remote-debugging-port={debugging_port}")
 
         desired_capabilities: Any = DesiredCapabilities.CHROME
         desired_capabilities["goog:loggingPrefs"] = {"performance": "ALL"}
 
         service = Service(executable_path=str(path))
         self.driver = webdriver.Chrome(service=service, options=options, desired_capabilities=desired_capabilities)
+        self.waits = Waits(self.driver)
+        self.session_store = SessionStore()
 
-        self.found_masters: Set[str] = set()
-        self.found_master_index: int = -1
+        self.network = NetworkCollector(self.driver)
+        self.logged_in = False
 
     def get_new_episodes(self, type: Types, latest_episode: Episode) -> List[Episode]:
-        episodes: List[Episode] = []
-
-        self._login()
+        return self.get_new_episodes_for_types({type: latest_episode})[type]
 
-        TealPrint.info("Getting episodes", color=attr("bold"), push_indent=True)
-        while True:
-            episodes.extend(self._get_all_episodes_on_page(type))
+    def get_new_episodes_for_types(self, latest_episodes: Dict[Types, Episode]) -> Dict[Types, List[Episode]]:
+        """Get new episodes for all types in a single pass over the library.
 
-            # Break if we have loaded more than the previous latest episode
-            last_episode = episodes[-1]
-            if last_episode.ops.number <= latest_episode.ops.number:
-                break
+        Args:
+            latest_episodes (Dict[Types, Episode]): The latest downloaded episode of each type
 
-            # Get the previous episode
-            self._search_episode(last_episode.ops.previous_episode())
+        Returns:
+            Dict[Types, List[Episode]]: New episodes for each type, sorted by number
+        """
+        catalog = Catalog()
+        oldest_latest = min(latest.ops.number for latest in latest_episodes.values())
 
-        TealPrint.pop_indent()
+        self.login()
 
-        # Only save later episodes than latest_episode
-        episodes = [episode for episode in episodes if episode.ops.number > latest_episode.ops.number]
-
-        # Sort episodes by number
-        episodes.sort(key=lambda episode: episode.ops.number)
-
-        return episodes
+        TealPrint.info("Getting episodes", color=attr("bold"), push_indent=True)
+        try:
+            page_episodes = self._get_all_episodes_on_page()
+            if len(page_episodes) == 0:
+                raise TransientError("Could not find any episodes in the library")
+
+            numbers = [episode.ops.number for episode in page_episodes]
+            catalog.merge(page_episodes, min(numbers), max(numbers))
+
+            # Break if we have loaded more than the previous latest episode of all types, or the rest of
+            # the episodes were listed in an earlier run
+            if not catalog.covers(latest_episodes):
+                # The search filters on the text, so searching for '22' lists all episodes from 220 to 229.
+                # Search one such group at a time until the oldest latest episode has been listed.
+                group = int(page_episodes[-1].ops.previous_episode()) // 10
+                while group >= 0:
+                    # The groups are searched right after each other, so everything up to the next group is listed
+                    catalog.merge(self._search_group(group), group * 10, group * 10 + 10)
+                    if group * 10 <= oldest_latest or catalog.covers(latest_episodes):
+                        break
+                    group -= 1
+        finally:
+            TealPrint.pop_indent()
+        catalog.save()
+
+        return catalog.new_episodes(latest_episodes)
+
+    def _search_group(self, group: int) -> List[Episode]:
+        """Get all episodes numbered from group * 10 to group * 10 + 9"""
+        if group > 0:
+            self._search(str(group))
+            page_episodes = self._get_all_episodes_on_page()
+
+            # When the page is full some of the episodes might not be shown, search for each number instead
+            if len(page_episodes) < _page_size:
+                return page_episodes
+
+        page_episodes = []
+        for number in range(group * 10 + 9, group * 10 - 1, -1):
+            if number > 0:
+                self._search(str(number))
+                page_episodes.extend(self._get_all_episodes_on_page())
+        return page_episodes
 
     def close(self) -> None:
         self.driver.close()
 
-    def _login(self) -> None:
+    def login(self) -> None:
+        if self.logged_in:
+            return
+
         TealPrint.info("Logging in to OPS", color=attr("bold"), push_indent=True)
         TealPrint.info("Opening login page")
+        rate_limiter.throttle(OPS._base_url)
         self.driver.get(OPS._base_url)
-        sleep(sleep_time)
 
         try:
             # Find the library button
-            self.driver.find_element(By.XPATH, ".//a[contains(@href,'/library')]")
-            sleep(sleep_time)
+            self._get_element(By.XPATH, ".//a[contains(@href,'/library')]")
 
         except NoSuchElementException as e:
-            TealPrint.error(f"Failed to find library button; {e.msg}", exit=True)
+            TealPrint.pop_indent()
+            raise TransientError(f"Failed to find library button; {e.msg}") from e
+
+        if self._restore_session():
+            TealPrint.info("Reused stored OPS session", color=fg("green"), pop_indent=True)
+            self.logged_in = True
+            return
 
         self.driver.get(f"{OPS._base_url}/library")
-        sleep(sleep_time)
 
         try:
-            login_button = self._get_element(By.XPATH, ".//*[contains(text(), 'Log In')]")
+            login_button = self._get_element(By.XPATH, _login_button_xpath)
             TealPrint.info("Clicking login button")
             login_button.click()
-            sleep(sleep_time)
 
             TealPrint.info("Entering email")
-            email_input = self.driver.find_element(By.NAME, "email")
+            email_input = self._get_element(By.NAME, "email")
             email_input.send_keys(config.ops.email)
-            sleep(sleep_time)
 
             TealPrint.info("Entering password")
-            password_input = self.driver.find_element(By.NAME, "password")
+            password_input = self._get_element(By.NAME, "password")
             password_input.send_keys(config.ops.password)
-            sleep(sleep_time)
 
             TealPrint.info("Clicking login button")
-            login_button = self.driver.find_element(By.XPATH, ".//*[contains(text(), 'Log in')]")
-            login_button.click()
-            sleep(sleep_time)
+            submit_locator = (By.XPATH, ".//*[contains(text(), 'Log in')]")
+            self._get_element(*submit_locator).click()
+
+            # Logged in when the login form is gone and the library has been loaded
+            self.waits.until(element_gone(submit_locator))
+            self._get_element(By.XPATH, _list_items_xpath)
 
         except NoSuchElementException as e:
-            TealPrint.error(f"Failed to get element; {e.msg}", exit=True)
+            TealPrint.pop_indent()
+            raise TransientError(f"Failed to get element; {e.msg}") from e
+        except TimeoutException as e:
+            TealPrint.pop_indent()
+            raise TransientError("Timed out waiting for the login form to close") from e
 
         TealPrint.info("Logged in to OPS", color=fg("green"), pop_indent=True)
-        sleep(page_load_time)
+        self.logged_in = True
+        self._save_session()
+
+    def _restore_session(self) -> bool:
+        """Load the stored session into the browser. Has to be called when a page on the OPS domain is open.
+
+        Returns:
+            True if the stored session is still logged in
+        """
+        session = self.session_store.load()
+        if not session:
+            return False
+
+        TealPrint.info("Restoring stored session")
+        for cookie in session.cookies:
+            try:
+                self.driver.add_cookie(cookie)
+            except WebDriverException:
+                TealPrint.debug(f"Skipping cookie {cookie.get('name')} for {cookie.get('domain')}")
+        self.driver.execute_script(_set_local_storage_script, session.local_storage)
+
+        # Session is valid when the library loads without a login button
+        self.driver.get(f"{OPS._base_url}/library")
+        if self.waits.try_until(element_present((By.XPATH, _list_items_xpath))):
+            if len(self.driver.find_elements(By.XPATH, _login_button_xpath)) == 0:
+                return True
+
+        TealPrint.info("Stored session is no longer valid")
+        self.session_store.clear()
+        self.driver.delete_all_cookies()
+        return False
+
+    def _save_session(self) -> None:
+        try:
+            cookies = self.driver.get_cookies()
+            local_storage = self.driver.execute_script(_get_local_storage_script) or {}
+            self.session_store.save(cookies, local_storage)
+        except (WebDriverException, OSError) as e:
+            TealPrint.warning(f"Could not store OPS session; {e}")
 
-    def _search_episode(self, number: float) -> None:
-        TealPrint.info(f"Searching for episode {int(number)}")
+    def _search(self, text: str) -> None:
+        TealPrint.info(f"Searching for episodes '{text}'")
+        previous_items = self.waits.list_items_snapshot(_list_items_css)
 
         try:
             search_input = self._get_element(By.XPATH, './/input[@type="text"]')
 
             # Search for the episode
             search_input.send_keys(Keys.CONTROL + "a")
-            search_input.send_keys(f"{int(number)}")
+            search_input.send_keys(text)
             search_input.send_keys(Keys.RETURN)
-        except NoSuchElementException:
-            TealPrint.error("Failed to find search input", exit=True)
+        except NoSuchElementException as e:
+            raise TransientError("Failed to find search input") from e
 
-        sleep(page_load_time)
+        # Reading the list before it has changed would list the episodes of the previous search
+        if not self.waits.try_until(
+            list_items_changed(self.waits, _list_items_css, previous_items, _no_results_locator)
+        ):
+            raise TransientError(f"Episode list didn't change after searching for '{text}'")
 
-    def _get_all_episodes_on_page(self, type: Types) -> List[Episode]:
+    def _get_all_episodes_on_page(self) -> List[Episode]:
         episodes: List[Episode] = []
 
-        try:
-            list_items = self.driver.find_elements(By.XPATH, ".//div[contains(@role,'listitem')]")
+        # Extract all list items in one call instead of several WebDriver calls per item
+        list_items: List[Dict[str, Any]] = self.driver.execute_script(_get_list_items_script, _list_items_css) or []
 
-            for item in list_items:
-                episode_info = self._get_episode_info(type, item)
-                if episode_info:
-                    episodes.append(episode_info)
-
-        except NoSuchElementException as e:
-            TealPrint.error(f"Failed to get videos on page; {e.msg}", exit=True)
+        for item in list_items:
+            episode_info = OPS._get_episode_info(item["spans"], item["href"])
+            if episode_info:
+                episodes.append(episode_info)
 
         return episodes
 
-    def _get_episode_info(self, type: Types, item: WebElement) -> Optional[Episode]:
-        episode = Episode()
-        episode.type = type
-
-        # Get Title, Number, and URL to video page
-        try:
-            spans = item.find_elements(By.XPATH, ".//p[contains(@class,'font_8')]/span")
+    @staticmethod
+    def _get_episode_info(spans: List[str], href: Optional[str]) -> Optional[Episode]:
+        """Create an episode from the texts and link of a list item.
 
-            if len(spans) != 2:
-                TealPrint.error("Title and episode spans are not equal to 2", exit=True)
+        Args:
+            spans (List[str]): Texts of the title and the 'type number' spans
+            href (Optional[str]): Link to the video page
+        """
+        episode = Episode()
 
-            # Title
-            episode.title = spans[0].text
+        # Get Title, Number, and URL to video page. Skip list items that aren't episodes
+        if len(spans) != 2:
+            TealPrint.warning(f"Skipping list item, title and episode spans are not equal to 2; {spans}")
+            return None
 
-            # Extract episode type and number
-            match = OPS._episode_regexp.match(spans[1].text)
-            if not match:
-                TealPrint.error(f"Could not match episode regexp; {spans[1].text}", exit=True)
-                return
+        # Title
+        episode.title = spans[0]
 
-            op_type = match[1]
-            episode.ops.number = float(match[2])
+        # Extract episode type and number
+        match = OPS._episode_regexp.match(spans[1])
+        if not match:
+            TealPrint.warning(f"Skipping list item, could not match episode regexp; {spans[1]}")
+            return None
 
-            # Map op
-            internal_type = OPS._op_type_to_internal_enum(op_type)
-            if not internal_type:
-                TealPrint.error(f"Unknown op type; {op_type}", exit=True)
-            elif internal_type != type:
-                return None
+        op_type = match[1]
+        episode.ops.number = float(match[2])
 
-            # Video URL page
-            episode.ops.url = item.find_element(By.XPATH, ".//a").get_attribute("href")
+        # Map op
+        internal_type = OPS._op_type_to_internal_enum(op_type)
+        if not internal_type:
+            TealPrint.warning(f"Skipping list item, unknown op type; {op_type}")
+            return None
+        episode.type = internal_type
 
-        except NoSuchElementException as e:
-            TealPrint.error(f"Failed to get title and episode spans; {e.msg}", exit=True)
+        # Video URL page
+        if not href:
+            TealPrint.warning(f"Skipping list item, failed to get link to video page; {episode.title}")
+            return None
+        episode.ops.url = href
 
         return episode
 
-    @staticmethod
-    def _op_type_to_internal_enum(op_type: str) -> Optional[Types]:
-        if op_type == "Q&A":
-            return Types.QA
-        if op_type == "Class":
-            return Types.CLASS
-
     def get_download_url(self, episode: Episode) -> None:
         TealPrint.info(f"Getting ffmpeg URL for {episode.ops.number}: {episode.title}", push_indent=True)
 
-        self.driver.get(episode.ops.url)
-        sleep(page_load_time)
-
-        # Click on the iframe
         try:
+            self.network.new_page()
+            rate_limiter.throttle(episode.ops.url)
+            self.driver.get(episode.ops.url)
+
+            # Click on the iframe
             iframe = self._get_element(By.XPATH, ".//iframe")
+            player_url = iframe.get_attribute("src")
 
             iframe.click()
-            sleep(page_load_time)
 
-            url = self._get_next_master_json()
+            url = self.waits.try_until(request_observed(lambda: self.network.master_json(player_url)))
             if not url:
-                TealPrint.error("Failed to find master.json", exit=True)
-                return
+                raise TransientError(f"Failed to find master.json\nURL: {episode.ops.url}")
 
             # Convert the URL to work with yt-dlp
             episode.ops.download_url = url.replace(".json?base64_init=1&", ".mpd?")
+            TealPrint.info("Got ffmpeg URL", color=fg("green"))
 
         except NoSuchElementException as e:
-            TealPrint.error(f"Failed to get element; {e.msg}\nURL: {episode.ops.url}", exit=True)
-
-        TealPrint.info("Got ffmpeg URL", color=fg("green"), pop_indent=True)
-        return
-
-    def _get_next_master_json(self) -> Optional[str]:
-        logs = self.driver.get_log("performance")
-
-        for i in range(len(logs)):
-            message = logs[i]["message"]
-            if "master.json" not in message:
-                continue
-
-            json_message = json.loads(message)["message"]
-            if json_message["method"] != "Network.requestWillBeSent":
-                continue
-
-            url = json_message["params"]["request"]["url"]
-            if not url or "master.json" not in url:
-                continue
-
-            # Check if this was already found before, then skip it
-            if url in self.found_masters:
-                continue
-
-            # Add to found masters
-            self.found_masters.add(url)
-            return url
-
-        return None
+            raise TransientError(f"Failed to get element; {e.msg}\nURL: {episode.ops.url}") from e
+        finally:
+            TealPrint.pop_indent()
 
     def _get_logs(self):
         logs = self.driver.get_log("performance")
@@ -269,10 +345,7 @@ class OPS:
         exit(0)
 
     def _get_element(self, type: str, value: str) -> WebElement:
-        started = time.time()
-        while True:
-            try:
-                return self.driver.find_element(type, value)
-            except NoSuchElementException as e:
-                if time.time() - started > get_element_timeout:
-                    raise e
+        try:
+            return self.waits.until(element_present((type, value)))
+        except TimeoutException:
+            raise NoSuchElementException(f"Timed out waiting for element {value}")
@@ -0,0 +1,19 @@
+import re
+from typing import Optional
+
+from ..core.type import Types
+
+
+class OPSBase:
+    """Site information and episode helpers shared by the browser and HTTP gateways.
+    Doesn't import selenium so it's cheap to import."""
+
+    _base_url = "https://www.objectivepersonalitysystem.com"
+    _episode_regexp = re.compile(r"([\w&]+) (\d+\.?\d?).*")
+
+    @staticmethod
+    def _op_type_to_internal_enum(op_type: str) -> Optional[Types]:
+        if op_type == "Q&A":
+            return Types.QA
+        if op_type == "Class":
+            return Types.CLASS
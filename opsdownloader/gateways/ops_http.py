@@ -0,0 +1,243 @@
+import html
+import re
+from threading import Lock
+from typing import Dict, List, Optional
+
+import requests
+from colored import attr, fg
+from requests.adapters import HTTPAdapter
+from tealprint import TealPrint
+
+from ..config import config
+from ..core.episode import Episode
+from ..core.type import Types
+from ..utils.resilience import rate_limiter
+from .catalog import Catalog
+from .ops_base import OPSBase
+from .ops_pool import OPSPool
+from .session_store import SessionStore
+
+request_timeout = 30
+
+
+class OPSHttp:
+    """Gets episodes and download URLs from OPS with plain HTTP requests instead of a browser.
+
+    The library and video pages are server side rendered by Wix, so all episode information
+    is available in the page source. Falls back to the Selenium OPS gateway whenever the
+    information can't be found in the page source.
+    """
+
+    _base_url = OPSBase._base_url
+    _vimeo_config_url = "https://player.vimeo.com/video/{}/config"
+    _item_regexp = re.compile(r'"comp-\w+__([0-9a-f-]{36})":\{')
+    _html_regexp = re.compile(r'"comp-\w+__([0-9a-f-]{36})":\{"html":"(.*?)(?<!\\)"\}')
+    _link_regexp = re.compile(r'"link":\{"href":"(.*?)(?<!\\)"')
+    _span_regexp = re.compile(r"<span>(.*?)<\\*/span>")
+    _vimeo_regexp = re.compile(r"(?:player\.vimeo\.com\\*/video|[^\w.]vimeo\.com)\\*/(\d+)")
+
+    def __init__(self, base_url: str = _base_url, pool_size: int = 4) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = "Mozilla/5.0 (X11; Linux x86_64) ops-downloader"
+
+        self.session_store = SessionStore()
+        self._fallback: Optional[OPSPool] = None
+        self._fallback_lock = Lock()
+        self._logged_in = False
+
+    def get_new_episodes(self, type: Types, latest_episode: Episode) -> List[Episode]:
+        return self.get_new_episodes_for_types({type: latest_episode})[type]
+
+    def get_new_episodes_for_types(self, latest_episodes: Dict[Types, Episode]) -> Dict[Types, List[Episode]]:
+        self._login()
+
+        TealPrint.info("Getting episodes", color=attr("bold"), push_indent=True)
+        episodes = self._get_all_episodes_on_page(self._get(f"{self.base_url}/library"))
+        TealPrint.pop_indent()
+
+        # The page markup changed or we weren't let in, the catalog can't tell if anything is new then
+        if len(episodes) == 0:
+            TealPrint.info("Could not find any episodes on the library page, falling back to the browser")
+            return self._get_fallback().get_new_episodes_for_types(latest_episodes)
+
+        # The library page lists all the newest episodes
+        catalog = Catalog()
+        numbers = [episode.ops.number for episode in episodes]
+        catalog.merge(episodes, min(numbers), max(numbers))
+        catalog.save()
+
+        # The library page only contains the latest episodes, let the browser search for older ones
+        # unless they were listed in an earlier run
+        if not catalog.covers(latest_episodes):
+            TealPrint.info("Library page doesn't reach the latest episodes, falling back to the browser")
+            return self._get_fallback().get_new_episodes_for_types(latest_episodes)
+
+        return catalog.new_episodes(latest_episodes)
+
+    def has_new_episodes(self, latest_episodes: Dict[Types, Episode]) -> Optional[bool]:
+        """Cheap check with a single request if there are any new episodes, without logging in.
+
+        Returns:
+            None if it can't be determined from the library page
+        """
+        try:
+            episodes = self._get_all_episodes_on_page(self._get(f"{self.base_url}/library"))
+        except requests.RequestException as e:
+            TealPrint.verbose(f"Could not check for new episodes; {e}")
+            return None
+        if len(episodes) == 0:
+            return None
+
+        # The page lists all episodes from the oldest one on it, regardless of type
+        oldest = min(episode.ops.number for episode in episodes)
+        for type, latest_episode in latest_episodes.items():
+            if any(episode.type == type and episode.ops.number > latest_episode.ops.number for episode in episodes):
+                return True
+            if latest_episode.ops.number < oldest:
+                return None
+        return False
+
+    def get_download_url(self, episode: Episode) -> None:
+        TealPrint.info(f"Getting ffmpeg URL for {episode.ops.number}: {episode.title}", push_indent=True)
+
+        try:
+            url = self._get_master_json(episode)
+            if not url:
+                TealPrint.info("Could not find master.json in page, falling back to the browser")
+                self._get_fallback().get_download_url(episode)
+                return
+
+            # Convert the URL to work with yt-dlp
+            episode.ops.download_url = OPSHttp._master_json_to_mpd(url)
+
+            TealPrint.info("Got ffmpeg URL", color=fg("green"))
+        finally:
+            TealPrint.pop_indent()
+
+    def close(self) -> None:
+        self.session.close()
+        if self._fallback:
+            self._fallback.close()
+
+    def _login(self) -> None:
+        """Opens the start page to get the Wix session cookies that are reused for all later requests.
+        Video content is protected client side by MemberSpace so no credentials are posted here,
+        the browser fallback logs in with them when it's needed.
+        """
+        if self._logged_in:
+            return
+
+        TealPrint.info("Opening OPS", color=attr("bold"))
+
+        # Reuse the cookies from the last browser login
+        session = self.session_store.load()
+        if session:
+            for cookie in session.cookies:
+                self.session.cookies.set(
+                    cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/")
+                )
+
+        self._get(self.base_url)
+        self._logged_in = True
+
+    def _get(self, url: str) -> str:
+        rate_limiter.throttle(url)
+        response = self.session.get(url, timeout=request_timeout)
+        response.raise_for_status()
+        return response.text
+
+    def _get_all_episodes_on_page(self, page: str) -> List[Episode]:
+        titles: Dict[str, List[str]] = {}
+        for match in OPSHttp._html_regexp.finditer(page):
+            span = OPSHttp._span_regexp.search(match[2])
+            if span:
+                titles.setdefault(match[1], []).append(OPSHttp._unescape(span[1]))
+
+        links = OPSHttp._get_links(page)
+
+        episodes: List[Episode] = []
+        for id, texts in titles.items():
+            episode = OPSHttp._to_episode(texts, links.get(id, ""))
+            if episode:
+                episodes.append(episode)
+        return episodes
+
+    @staticmethod
+    def _get_links(page: str) -> Dict[str, str]:
+        """Map repeater item ids to the link inside the item. A link belongs to the item whose
+        component was opened closest before it."""
+        links: Dict[str, str] = {}
+        item_id = ""
+        position = 0
+        for link in OPSHttp._link_regexp.finditer(page):
+            for item in OPSHttp._item_regexp.finditer(page, position, link.start()):
+                item_id = item[1]
+            position = link.end()
+            if item_id and item_id not in links:
+                links[item_id] = OPSHttp._unescape(link[1])
+        return links
+
+    @staticmethod
+    def _to_episode(texts: List[str], url: str) -> Optional[Episode]:
+        if len(texts) != 2 or not url:
+            return None
+
+        # One of the texts is the title, the other the type and number
+        for title, type_and_number in [(texts[0], texts[1]), (texts[1], texts[0])]:
+            match = OPSBase._episode_regexp.match(type_and_number)
+            if not match:
+                continue
+
+            internal_type = OPSBase._op_type_to_internal_enum(match[1])
+            if not internal_type:
+                continue
+
+            episode = Episode()
+            episode.type = internal_type
+            episode.title = title
+            episode.ops.number = float(match[2])
+            episode.ops.url = url
+            return episode
+
+        return None
+
+    def _get_master_json(self, episode: Episode) -> Optional[str]:
+        match = OPSHttp._vimeo_regexp.search(self._get(episode.ops.url))
+        if not match:
+            return None
+
+        config_url = self._vimeo_config_url.format(match[1])
+        rate_limiter.throttle(config_url)
+        response = self.session.get(
+            config_url,
+            headers={"Referer": episode.ops.url},
+            timeout=request_timeout,
+        )
+        if not response.ok:
+            return None
+
+        try:
+            dash = response.json()["request"]["files"]["dash"]
+            return dash["cdns"][dash["default_cdn"]]["url"]
+        except (KeyError, ValueError):
+            return None
+
+    @staticmethod
+    def _master_json_to_mpd(url: str) -> str:
+        if ".json?base64_init=1&" in url:
+            return url.replace(".json?base64_init=1&", ".mpd?")
+        return url.replace(".json?base64_init=1", ".mpd")
+
+    @staticmethod
+    def _unescape(text: str) -> str:
+        return html.unescape(re.sub(r"\\+([/\"])", r"\1", text))
+
+    def _get_fallback(self) -> OPSPool:
+        with self._fallback_lock:
+            if not self._fallback:
+                self._fallback = OPSPool(config.ops.resolvers)
+            return self._fallback
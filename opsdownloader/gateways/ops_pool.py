@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from pathlib import Path
+from queue import Queue
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from tealprint import TealPrint
+
+from ..core.episode import Episode
+from ..core.type import Types
+
+if TYPE_CHECKING:
+    from .ops import OPS
+
+# Rough memory usage of one headless Chrome with an episode page open
+_driver_memory = 400 * 1024**2
+_first_debugging_port = 9222
+
+
+class OPSPool:
+    """Pool of browsers that resolve download URLs concurrently.
+
+    The first browser logs in and lists the episodes. The other browsers are started when
+    they are needed, after the first one has logged in, and reuse its stored login session.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = OPSPool._limit_by_memory(max(1, size))
+        self._all: List[OPS] = []
+        self._idle: "Queue[OPS]" = Queue()
+        self._lock = Lock()
+        self._primary: Optional[OPS] = None
+
+    @property
+    def primary(self) -> OPS:
+        """The logged in browser that lists episodes. Started the first time it's needed"""
+        with self._lock:
+            if not self._primary:
+                self._primary = self._create()
+            # Other browsers are only handed out after this, so they can reuse its stored session
+            self._primary.login()
+            return self._primary
+
+    def get_new_episodes(self, type: Types, latest_episode: Episode) -> List[Episode]:
+        return self.primary.get_new_episodes(type, latest_episode)
+
+    def get_new_episodes_for_types(self, latest_episodes: Dict[Types, Episode]) -> Dict[Types, List[Episode]]:
+        return self.primary.get_new_episodes_for_types(latest_episodes)
+
+    def get_download_url(self, episode: Episode) -> None:
+        ops = self._acquire()
+        try:
+            ops.login()
+            ops.get_download_url(episode)
+        finally:
+            self._idle.put(ops)
+
+    def close(self) -> None:
+        for ops in self._all:
+            ops.close()
+
+    def _acquire(self) -> OPS:
+        # Make sure the browser is logged in before any other browser is started
+        self.primary
+        if self._idle.empty():
+            with self._lock:
+                if len(self._all) < self.size:
+                    return self._create(track_idle=False)
+        return self._idle.get()
+
+    def _create(self, track_idle: bool = True) -> OPS:
+        # Selenium is slow to import, only import it when a browser is needed
+        from .ops import OPS
+
+        ops = OPS(debugging_port=_first_debugging_port + len(self._all))
+        self._all.append(ops)
+        if track_idle:
+            self._idle.put(ops)
+        return ops
+
+    @staticmethod
+    def _limit_by_memory(size: int) -> int:
+        available = OPSPool._available_memory()
+        if available is None:
+            return size
+
+        limited = max(1, min(size, available // _driver_memory))
+        if limited < size:
+            TealPrint.verbose(f"Only starting {limited} browsers because of available memory")
+        return limited
+
+    @staticmethod
+    def _available_memory() -> Optional[int]:
+        try:
+            for line in Path("/proc/meminfo").read_text().splitlines():
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        return None
@@ -1,69 +1,113 @@
-import re
-import shutil
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import List
 
 from tealprint import TealPrint
 
 from ..core.episode import Episode
 from ..core.type import Types
+from ..utils.files import atomic_move
+from .integrity_index import IntegrityIndex
+from .plex_index import PlexIndex
+from .verifier import VerificationError, Verifier
 
 
 class Plex:
     def __init__(self, dir: Path) -> None:
         self.dir = dir
+        self.index = PlexIndex(dir)
+        self.integrity = IntegrityIndex(dir)
 
     def get_last_episode_info(self, type: Types) -> Episode:
-        season = datetime.now().year
-
-        # Get from current season
-        episode_info = self._get_last_episode_info_from_season(type, season)
-        if episode_info:
-            TealPrint.info(f"Found last episode in season {season}: {episode_info.number} ({episode_info.ops.number})")
-            return episode_info
-
-        # Not current season exists, check previous season
-        episode_info = self._get_last_episode_info_from_season(type, season - 1)
-        if episode_info:
-            TealPrint.info(
-                f"Found last episode in season {season - 1}: {episode_info.number} ({episode_info.ops.number})"
-            )
-            return episode_info
-
-        # No previous season exists, create empty episode info
-        TealPrint.warning("No previous season found...")
-        return Episode()
-
-    def _get_last_episode_info_from_season(self, type: Types, season: int) -> Optional[Episode]:
-        regexp = re.compile(rf"{type.value} - s{season}e0?0?(\d+) - .*\((\d+\.?\d?)\)\.mp4")
-        season_dir: Path = self.dir / type.value / f"Season {season}"
-
-        if not season_dir.exists():
-            return None
-
-        latest_episode = 0
-        episode_info = Episode()
-        for file in season_dir.glob("*.mp4"):
-            match = regexp.match(file.name)
-            if not match:
-                continue
+        self.index.refresh()
+        self._warn_about_library_problems(type)
 
-            internal_episode_number = int(match[1])
-            ops_episode_number = match[2]
+        entry = self.index.last_episode(type)
+        if not entry:
+            # No previous season exists, create empty episode info
+            TealPrint.warning("No previous season found...")
+            return Episode()
 
-            if internal_episode_number < latest_episode:
-                continue
+        TealPrint.info(f"Found last episode in season {entry.season}: {entry.number} ({entry.ops_number})")
+        episode_info = Episode()
+        episode_info.type = type
+        episode_info.season = entry.season
+        episode_info.number = entry.number
+        episode_info.ops.number = entry.ops_number
+        return episode_info
 
-            latest_episode = internal_episode_number
-            episode_info.number = internal_episode_number
-            episode_info.ops.number = float(ops_episode_number)
-            episode_info.season = season
+    def _warn_about_library_problems(self, type: Types) -> None:
+        for ops_number, names in self.index.duplicates(type).items():
+            TealPrint.warning(f"OPS episode {ops_number} exists in several files: {', '.join(names)}")
 
-        return episode_info
+        last = self.index.last_episode(type)
+        if last:
+            gaps = self.index.gaps(type, last.season)
+            if gaps:
+                TealPrint.warning(f"Missing episodes in {type.value} season {last.season}: {gaps}")
 
     def move_episode(self, episode: Episode) -> None:
         season_dir = self.dir / episode.type.value / f"Season {episode.season}"
         season_dir.mkdir(parents=True, exist_ok=True)
 
-        shutil.move(episode.file, season_dir / episode.file.name)
+        # Don't use the name of the file, a resumed episode has the number from an earlier run which can
+        # have changed, e.g. in a new year or when an earlier episode is no longer listed
+        file = season_dir / Path(episode.filename).with_suffix(episode.file.suffix).name
+        started = time.time()
+        copied = atomic_move(episode.file, file)
+        elapsed = max(time.time() - started, 0.001)
+
+        if copied > 0:
+            mib = copied / 1024**2
+            TealPrint.info(f"Copied {mib:.0f} MiB to Plex in {elapsed:.1f}s ({mib / elapsed:.1f} MiB/s)")
+            TealPrint.verbose("Put scratch_dir on the same filesystem as plex_dir to move episodes without copying")
+        else:
+            TealPrint.verbose(f"Moved {file.name} to Plex in {elapsed:.3f}s")
+        episode.file = file
+        self.index.add(episode.type, episode.season, episode.number, episode.ops.number, file)
+        if episode.sha256:
+            self.integrity.add(file, episode.sha256, episode.duration)
+            self.integrity.save()
+
+    def verify_library(self, verifier: Verifier, workers: int) -> List[Path]:
+        """Verify all episodes in the library that are new or have changed since they were last verified.
+
+        Returns:
+            Files that failed verification, now or in an earlier run
+        """
+        self.index.refresh()
+        files: List[Path] = []
+        for type in Types:
+            for entry in self.index.entries(type):
+                files.append(self.dir / type.value / f"Season {entry.season}" / entry.name)
+
+        failed: List[Path] = []
+        unverified: List[Path] = []
+        for file in files:
+            entry = self.integrity.get(file)
+            if not entry:
+                unverified.append(file)
+            elif not entry.ok:
+                failed.append(file)
+
+        TealPrint.info(f"Verifying {len(unverified)} of {len(files)} episodes in the library")
+
+        def verify(file: Path) -> None:
+            try:
+                verification = verifier.verify_file(file)
+                self.integrity.add(file, verification.sha256, verification.duration)
+            except VerificationError as e:
+                TealPrint.warning(str(e))
+                self.integrity.add(file, "", 0, ok=False)
+                failed.append(file)
+
+        try:
+            with ThreadPoolExecutor(max(1, workers), thread_name_prefix="verify") as executor:
+                for _ in executor.map(verify, unverified):
+                    pass
+        finally:
+            self.integrity.remove_missing()
+            self.integrity.save()
+
+        return failed
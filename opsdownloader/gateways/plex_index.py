@@ -0,0 +1,163 @@
+import re
+from pathlib import Path
+from threading import RLock
+from typing import Any, Dict, List, Optional
+
+from tealprint import TealPrint
+
+from ..config import config
+from ..core.type import Types
+from ..utils.files import load_json, save_json
+
+_version = 1
+_season_regexp = re.compile(r"Season (\d+)")
+_extensions = [".mp4", ".mkv"]
+
+
+class IndexEntry:
+    __slots__ = ["type", "season", "number", "ops_number", "name"]
+
+    def __init__(self, type: Types, season: int, number: int, ops_number: float, name: str) -> None:
+        self.type = type
+        self.season = season
+        self.number = number
+        self.ops_number = ops_number
+        self.name = name
+
+
+class _Season:
+    def __init__(self, mtime: float, entries: List[IndexEntry]) -> None:
+        self.mtime = mtime
+        self.entries = entries
+
+
+class PlexIndex:
+    """Index of all episodes in the Plex library, stored as a manifest file.
+
+    Season directories are only rescanned when their mtime has changed since the last refresh.
+    Episodes of different types are moved into the library at the same time, so all access is locked.
+    """
+
+    def __init__(self, dir: Path, path: Optional[Path] = None) -> None:
+        self.dir = dir
+        self.path = path or Path.home().joinpath(f".{config.app_name}-plex-index.json")
+        self._seasons: Dict[str, _Season] = {}
+        self._lock = RLock()
+        self._load()
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self) -> None:
+        seasons: Dict[str, _Season] = {}
+        scanned = 0
+
+        for type in Types:
+            type_dir = self.dir / type.value
+            if type == Types.UNKNOWN or not type_dir.is_dir():
+                continue
+
+            for season_dir in type_dir.iterdir():
+                match = _season_regexp.fullmatch(season_dir.name)
+                if not match or not season_dir.is_dir():
+                    continue
+
+                key = f"{type.value}/{season_dir.name}"
+                mtime = season_dir.stat().st_mtime
+                season = self._seasons.get(key)
+                if not season or season.mtime != mtime:
+                    season = _Season(mtime, PlexIndex._scan_season(season_dir, type, int(match[1])))
+                    scanned += 1
+                seasons[key] = season
+
+        if scanned > 0 or seasons.keys() != self._seasons.keys():
+            TealPrint.verbose(f"Rescanned {scanned} season directories in the Plex library")
+            self._seasons = seasons
+            self.save()
+
+    def add(self, type: Types, season: int, number: int, ops_number: float, file: Path) -> None:
+        """Add a file that was just moved into the library"""
+        key = f"{type.value}/{file.parent.name}"
+        with self._lock:
+            if key not in self._seasons:
+                self._seasons[key] = _Season(0, [])
+            season_info = self._seasons[key]
+            season_info.entries.append(IndexEntry(type, season, number, ops_number, file.name))
+            season_info.mtime = file.parent.stat().st_mtime
+            self.save()
+
+    def entries(self, type: Types) -> List[IndexEntry]:
+        entries: List[IndexEntry] = []
+        with self._lock:
+            for season in self._seasons.values():
+                entries.extend(entry for entry in season.entries if entry.type == type)
+        return entries
+
+    def last_episode(self, type: Types) -> Optional[IndexEntry]:
+        entries = self.entries(type)
+        if len(entries) == 0:
+            return None
+        return max(entries, key=lambda entry: (entry.season, entry.number))
+
+    def duplicates(self, type: Types) -> Dict[float, List[str]]:
+        """OPS episodes that exist in more than one file"""
+        files: Dict[float, List[str]] = {}
+        for entry in self.entries(type):
+            files.setdefault(entry.ops_number, []).append(entry.name)
+        return {number: names for number, names in files.items() if len(names) > 1}
+
+    def gaps(self, type: Types, season: int) -> List[int]:
+        """Episode numbers that are missing in a season"""
+        numbers = set(entry.number for entry in self.entries(type) if entry.season == season)
+        if len(numbers) == 0:
+            return []
+        return [number for number in range(1, max(numbers) + 1) if number not in numbers]
+
+    def save(self) -> None:
+        with self._lock:
+            data = {
+                "dir": str(self.dir),
+                "seasons": {
+                    key: {
+                        "mtime": season.mtime,
+                        "files": [
+                            [entry.name, entry.season, entry.number, entry.ops_number] for entry in season.entries
+                        ],
+                    }
+                    for key, season in self._seasons.items()
+                },
+            }
+            save_json(self.path, data, "Plex library index", _version)
+
+    def _load(self) -> None:
+        self._seasons = load_json(self.path, "Plex library index", self._parse, _version) or {}
+
+    def _parse(self, data: Any) -> Optional[Dict[str, _Season]]:
+        # The index is for another library
+        if data["dir"] != str(self.dir):
+            return None
+
+        seasons: Dict[str, _Season] = {}
+        for key, season in data["seasons"].items():
+            type = Types(key.split("/")[0])
+            entries = [IndexEntry(type, file[1], file[2], file[3], file[0]) for file in season["files"]]
+            seasons[key] = _Season(season["mtime"], entries)
+        return seasons
+
+    @staticmethod
+    def _scan_season(season_dir: Path, type: Types, season: int) -> List[IndexEntry]:
+        regexp = re.compile(rf"{re.escape(type.value)} - s{season}e(\d+) - .*\((\d+\.?\d?)\)$")
+        entries: List[IndexEntry] = []
+
+        for file in season_dir.iterdir():
+            if file.suffix not in _extensions:
+                continue
+
+            match = regexp.match(file.stem)
+            if not match:
+                continue
+
+            entries.append(IndexEntry(type, season, int(match[1]), float(match[2]), file.name))
+
+        return entries
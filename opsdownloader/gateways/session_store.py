@@ -0,0 +1,57 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from tealprint import TealPrint
+
+from ..config import config
+from ..utils.files import load_json, write_atomic
+
+
+class Session:
+    def __init__(self, cookies: List[Dict[str, Any]], local_storage: Dict[str, str], expires: float) -> None:
+        self.cookies = cookies
+        self.local_storage = local_storage
+        self.expires = expires
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires
+
+
+class SessionStore:
+    """Stores the authenticated OPS browser session on disk so later runs can skip the login form"""
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or Path.home().joinpath(f".{config.app_name}-session.json")
+
+    def load(self) -> Optional[Session]:
+        session = load_json(
+            self.path,
+            "session file",
+            lambda data: Session(data["cookies"], data.get("local_storage", {}), float(data["expires"])),
+        )
+        if not session:
+            return None
+
+        if session.expired:
+            TealPrint.verbose("Stored OPS session has expired")
+            self.clear()
+            return None
+
+        return session
+
+    def save(self, cookies: List[Dict[str, Any]], local_storage: Dict[str, str]) -> None:
+        # Expire the session when the first cookie expires, but never later than session_max_age
+        expires = time.time() + config.ops.session_max_age * 3600
+        for cookie in cookies:
+            if "expiry" in cookie:
+                expires = min(expires, float(cookie["expiry"]))
+
+        data = {"cookies": cookies, "local_storage": local_storage, "expires": expires}
+
+        write_atomic(self.path, json.dumps(data), 0o600)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,63 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Any, Callable, Dict, Optional
+
+from tealprint import TealPrint
+
+
+class StatusServer:
+    """Small local HTTP server that tells if the daemon works, e.g. for a health check of a container
+
+    GET /health returns 200 when healthy and 503 otherwise, GET /status returns the status as JSON.
+
+    Args:
+        status (Callable[[], Dict[str, Any]]): Returns the current status
+        healthy (Callable[[], bool]): Returns if the daemon is healthy
+    """
+
+    def __init__(self, host: str, port: int, status: Callable[[], Dict[str, Any]], healthy: Callable[[], bool]) -> None:
+        self.host = host
+        self.port = port
+        self.status = status
+        self.healthy = healthy
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> None:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path == "/health":
+                    healthy = server.healthy()
+                    self._respond(200 if healthy else 503, "text/plain", b"ok\n" if healthy else b"unhealthy\n")
+                elif self.path == "/status":
+                    self._respond(200, "application/json", json.dumps(server.status()).encode())
+                else:
+                    self._respond(404, "text/plain", b"not found\n")
+
+            def _respond(self, code: int, content_type: str, body: bytes) -> None:
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                TealPrint.debug(f"Status server; {format % args}")
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            TealPrint.warning(f"Could not start the status server on {self.host}:{self.port}; {e}")
+            return
+
+        self._server.daemon_threads = True
+        Thread(target=self._server.serve_forever, name="status-server", daemon=True).start()
+        TealPrint.verbose(f"Status server listening on http://{self.host}:{self.port}")
+
+    def close(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
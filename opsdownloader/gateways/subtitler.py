@@ -0,0 +1,183 @@
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from threading import Lock
+from typing import Any, Iterator, Optional
+
+from tealprint import TealPrint
+
+from ..core.episode import Episode
+from ..utils.files import write_atomic
+from ..utils.resilience import TransientError
+
+# Sample rate and format that the speech model expects
+_sample_rate = 16000
+_read_size = 1024**2
+# Audio is transcribed in windows of this many seconds, so that a long class doesn't have to fit in memory
+_window_seconds = 600
+_cache_version = 1
+
+# Speech model of the worker process, loaded once when the process starts
+_model: Any = None
+
+
+class SubtitleError(Exception):
+    pass
+
+
+class Subtitler:
+    """Generates English subtitles for episodes with a local speech model that runs on the CPU.
+
+    The audio is decoded by ffmpeg straight into a pipe and transcribed with faster-whisper in a pool of
+    processes, so that transcribing doesn't hold up the downloads. The audio is hashed and transcribed in
+    chunks, so only a window of it is in memory. Transcripts are cached by a hash of the decoded audio, so
+    an episode that is downloaded again isn't transcribed again.
+
+    Args:
+        cache_dir (Path): Directory where the transcripts are stored as .srt files
+        model (str): faster-whisper model name, e.g. small or medium.en, or path to a converted model
+        language (str): Language that is spoken in the episodes
+        workers (int): Number of episodes that are transcribed at the same time. 0 uses one process for
+            every 4 available cores
+    """
+
+    def __init__(self, cache_dir: Path, model: str = "small", language: str = "en", workers: int = 0) -> None:
+        if not importlib.util.find_spec("faster_whisper"):
+            TealPrint.error(
+                "Subtitles need faster-whisper, install it with: pip install ops-downloader[subtitles]", exit=True
+            )
+
+        self.cache_dir = cache_dir
+        self.model = model
+        self.language = language
+
+        cores = Subtitler._available_cores()
+        self.workers = workers if workers > 0 else max(1, cores // 4)
+        # Split the cores between the processes, the model runs its own threads
+        self.threads = max(1, cores // self.workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = Lock()
+
+    def generate(self, episode: Episode) -> None:
+        """Generate subtitles for the downloaded episode. They are added to the file when it's rerendered"""
+        TealPrint.info(f"Generating subtitles for {episode.title}")
+        pool = self._get_pool()
+        try:
+            subtitles = pool.submit(_generate, str(episode.file), str(self.cache_dir), self.model, self.language)
+            episode.subtitles = Path(subtitles.result())
+        except BrokenProcessPool as e:
+            # A worker died, e.g. killed when running out of memory. Start a new pool for the next try
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise TransientError(f"Subtitle worker stopped unexpectedly; {e}") from e
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if not self._pool:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                # Spawn instead of fork, the pipeline has threads running
+                self._pool = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model, self.threads),
+                )
+            return self._pool
+
+    @staticmethod
+    def _available_cores() -> int:
+        try:
+            return len(os.sched_getaffinity(0))
+        except AttributeError:
+            return os.cpu_count() or 1
+
+
+def _init_worker(model: str, threads: int) -> None:
+    global _model
+
+    # Let downloads and remuxing go first, transcribing can wait
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+    from faster_whisper import WhisperModel
+
+    _model = WhisperModel(model, device="cpu", compute_type="int8", cpu_threads=threads)
+
+
+def _generate(file: str, cache_dir: str, model: str, language: str) -> str:
+    """Runs in the worker process
+
+    Returns:
+        Path to the .srt file
+    """
+    key = hashlib.sha256(f"{_cache_version}/{model}/{language}/".encode())
+    for chunk in _decode_audio(file, _read_size):
+        key.update(chunk)
+    cache_file = Path(cache_dir) / f"{key.hexdigest()}.srt"
+    if cache_file.is_file():
+        return str(cache_file)
+
+    import numpy
+
+    # Decoding again is much cheaper than keeping hours of audio in memory
+    lines = []
+    start = 0.0
+    for window in _decode_audio(file, _window_seconds * _sample_rate * 2):
+        samples = numpy.frombuffer(window, numpy.int16).astype(numpy.float32) / 32768.0
+        segments, _ = _model.transcribe(samples, language=language, vad_filter=True)
+        for segment in segments:
+            times = f"{_srt_time(start + segment.start)} --> {_srt_time(start + segment.end)}"
+            lines.append(f"{len(lines) + 1}\n{times}\n{segment.text.strip()}\n")
+        start += len(window) / 2 / _sample_rate
+
+    write_atomic(cache_file, "\n".join(lines))
+    return str(cache_file)
+
+
+def _decode_audio(file: str, size: int) -> Iterator[bytes]:
+    """Decode the audio to 16 kHz mono PCM through a pipe, without writing a WAV file. Yields chunks of size bytes,
+    the last one can be smaller"""
+    import ffmpeg
+
+    process = (
+        ffmpeg.input(file)
+        .output("pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar=_sample_rate)
+        .global_args("-loglevel", "error")
+        .run_async(pipe_stdout=True, pipe_stderr=True)
+    )
+
+    try:
+        while True:
+            chunk = process.stdout.read(size)
+            if not chunk:
+                break
+            yield chunk
+        error = process.stderr.read().decode(errors="replace")
+        if process.wait() != 0:
+            raise SubtitleError(f"Could not decode the audio of {Path(file).name}; {error}")
+    finally:
+        # Stopped early, e.g. when transcribing failed
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def _srt_time(seconds: float) -> str:
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600 * 1000)
+    minutes, milliseconds = divmod(milliseconds, 60 * 1000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
@@ -0,0 +1,110 @@
+import re
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+import requests
+from tealprint import TealPrint
+
+from ..config import config
+from ..utils.files import load_json, save_json
+
+# Don't use URLs that expire before a download would finish
+_expiry_margin = 15 * 60
+_revalidate_timeout = 10
+_exp_regexp = re.compile(r"exp=(\d+)")
+
+
+class UrlCache:
+    """Persistent cache of download URLs keyed by the episode page URL.
+
+    Entries expire when the signed URL expires, or after default_ttl seconds for URLs without an expiry.
+    A cached URL is checked with a HEAD request before it's used.
+    """
+
+    def __init__(self, path: Optional[Path] = None, default_ttl: float = 3600, max_entries: int = 200) -> None:
+        self.path = path or Path.home().joinpath(f".{config.app_name}-url-cache.json")
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Dict] = {}
+        self._lock = Lock()
+        self._load()
+
+    def get(self, page_url: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(page_url)
+            if not entry:
+                return None
+            if entry["expires"] - _expiry_margin < time.time():
+                del self._entries[page_url]
+                return None
+
+        download_url = entry["download_url"]
+        if not UrlCache._revalidate(download_url):
+            TealPrint.verbose("Cached download URL is no longer valid")
+            with self._lock:
+                self._entries.pop(page_url, None)
+            return None
+
+        return download_url
+
+    def put(self, page_url: str, download_url: str) -> None:
+        if not download_url:
+            return
+
+        with self._lock:
+            self._entries.pop(page_url, None)
+            self._entries[page_url] = {"download_url": download_url, "expires": self._expires(download_url)}
+            self._evict()
+            self._save()
+
+    def _expires(self, download_url: str) -> float:
+        """Get the expiry from signed URLs, e.g. 'exp=1660000000~acl=...~hmac=...' or '?expires=1660000000'"""
+        url = unquote(download_url)
+        match = _exp_regexp.search(url)
+        if match:
+            return float(match[1])
+
+        query = parse_qs(urlparse(download_url).query)
+        for key in ["expires", "Expires"]:
+            if key in query and query[key][0].isdigit():
+                return float(query[key][0])
+
+        return time.time() + self.default_ttl
+
+    def _evict(self) -> None:
+        now = time.time()
+        self._entries = {url: entry for url, entry in self._entries.items() if entry["expires"] > now}
+
+        # Dicts keep insertion order, remove the oldest entries first
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def _load(self) -> None:
+        self._entries = load_json(self.path, "download URL cache", UrlCache._parse) or {}
+        self._evict()
+
+    @staticmethod
+    def _parse(data: Any) -> Dict[str, Dict]:
+        return {
+            url: {"download_url": entry["download_url"], "expires": float(entry["expires"])}
+            for url, entry in data.items()
+        }
+
+    def _save(self) -> None:
+        save_json(self.path, self._entries, "download URL cache")
+
+    @staticmethod
+    def _revalidate(download_url: str) -> bool:
+        try:
+            response = requests.head(download_url, timeout=_revalidate_timeout, allow_redirects=True)
+            if response.status_code == 405:
+                response = requests.get(
+                    download_url, headers={"Range": "bytes=0-0"}, timeout=_revalidate_timeout, stream=True
+                )
+                response.close()
+            return response.ok
+        except requests.RequestException:
+            return False
@@ -0,0 +1,70 @@
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+from ..core.episode import Episode
+
+_read_size = 4 * 1024**2
+# Allowed difference between the duration of the file and the duration in the manifest, in seconds
+_duration_tolerance = 2.0
+
+
+class VerificationError(Exception):
+    pass
+
+
+class Verification:
+    __slots__ = ["sha256", "duration"]
+
+    def __init__(self, sha256: str, duration: float) -> None:
+        self.sha256 = sha256
+        self.duration = duration
+
+
+class Verifier:
+    """Checks that a file is complete before it's moved to Plex.
+
+    The duration of the container is compared with the duration from the manifest when it's known,
+    and a SHA-256 hash of the file is calculated for the integrity index.
+    """
+
+    def verify(self, episode: Episode) -> None:
+        verification = self.verify_file(episode.file, episode.ops.duration)
+        episode.sha256 = verification.sha256
+        episode.duration = verification.duration
+
+    def verify_file(self, file: Path, expected_duration: Optional[float] = None) -> Verification:
+        if not file.is_file() or file.stat().st_size == 0:
+            raise VerificationError(f"{file.name} is missing or empty")
+
+        duration = self._probe_duration(file)
+        if duration <= 0:
+            raise VerificationError(f"{file.name} has no duration")
+        if expected_duration and abs(duration - expected_duration) > _duration_tolerance:
+            raise VerificationError(f"{file.name} is {duration:.1f}s long, expected {expected_duration:.1f}s")
+
+        return Verification(Verifier.hash_file(file), duration)
+
+    def _probe_duration(self, file: Path) -> float:
+        """Duration of the container in seconds, reads only the headers of the file"""
+        import ffmpeg
+
+        try:
+            probe = ffmpeg.probe(str(file))
+            return float(probe["format"]["duration"])
+        except (ffmpeg.Error, KeyError, ValueError) as e:
+            raise VerificationError(f"Could not read the duration of {file.name}; {e}")
+
+    @staticmethod
+    def hash_file(file: Path) -> str:
+        # hashlib releases the GIL for large buffers, so several files can be hashed in parallel
+        sha256 = hashlib.sha256()
+        with file.open("rb", buffering=0) as f:
+            buffer = bytearray(_read_size)
+            view = memoryview(buffer)
+            while True:
+                size = f.readinto(buffer)
+                if not size:
+                    break
+                sha256.update(view[:size])
+        return sha256.hexdigest()
@@ -0,0 +1,94 @@
+import time
+from typing import Callable, Optional, Tuple, TypeVar
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.support.wait import WebDriverWait
+
+from ..config import config
+
+T = TypeVar("T")
+
+# Seconds the list has to stay empty before it counts as empty, it's briefly empty while results load
+_empty_settle = 1.0
+
+_list_items_script = """
+return Array.from(document.querySelectorAll(arguments[0])).map(item => item.innerText).join("\\n");
+"""
+
+
+class Waits:
+    """Explicit waits that return as soon as the condition holds instead of sleeping a fixed time"""
+
+    def __init__(self, driver: WebDriver) -> None:
+        self.driver = driver
+
+    def until(self, condition: Callable[[WebDriver], T], timeout: Optional[float] = None) -> T:
+        """Wait until condition returns something truthy and return it.
+
+        Raises:
+            TimeoutException if the condition didn't hold within the timeout
+        """
+        wait = WebDriverWait(
+            self.driver,
+            timeout if timeout is not None else config.ops.wait_timeout,
+            poll_frequency=config.ops.poll_interval,
+            ignored_exceptions=(NoSuchElementException, StaleElementReferenceException),
+        )
+        return wait.until(condition)
+
+    def try_until(self, condition: Callable[[WebDriver], T], timeout: Optional[float] = None) -> Optional[T]:
+        """Same as until() but returns None instead of raising on timeout"""
+        try:
+            return self.until(condition, timeout)
+        except TimeoutException:
+            return None
+
+    def list_items_snapshot(self, css_selector: str) -> str:
+        """Text of all items in a list, used to check when a list has changed"""
+        return self.driver.execute_script(_list_items_script, css_selector) or ""
+
+
+def element_present(locator: Tuple[str, str]):
+    def condition(driver: WebDriver):
+        return driver.find_element(*locator)
+
+    return condition
+
+
+def element_gone(locator: Tuple[str, str]):
+    def condition(driver: WebDriver) -> bool:
+        return len(driver.find_elements(*locator)) == 0
+
+    return condition
+
+
+def list_items_changed(waits: Waits, css_selector: str, previous: str, no_results: Optional[Tuple[str, str]] = None):
+    """Holds when the text of the list items differs from the previous snapshot. An empty list is a change too,
+    when no_results is shown after a non-empty list, or else when it has stayed empty for a moment"""
+    empty_since: Optional[float] = None
+
+    def condition(driver: WebDriver) -> bool:
+        nonlocal empty_since
+
+        current = waits.list_items_snapshot(css_selector)
+        if current != "":
+            empty_since = None
+            return current != previous
+
+        if previous != "" and no_results and len(driver.find_elements(*no_results)) > 0:
+            return True
+        if empty_since is None:
+            empty_since = time.monotonic()
+        return time.monotonic() - empty_since >= _empty_settle
+
+    return condition
+
+
+def request_observed(find: Callable[[], Optional[str]]):
+    """Holds when find() returns a URL, e.g. a master.json request in the performance log"""
+
+    def condition(driver: WebDriver) -> Optional[str]:
+        return find()
+
+    return condition
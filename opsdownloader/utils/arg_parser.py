@@ -15,5 +15,31 @@ def get_args() -> argparse.Namespace:
         action="store_true",
         help="Turn on debug messages. This automatically turns on --verbose as well.",
     )
+    parser.add_argument(
+        "-s",
+        "--silent",
+        action="store_true",
+        help="Only print warnings and errors.",
+    )
+    parser.add_argument(
+        "--pretend",
+        action="store_true",
+        help="Only print the new episodes, doesn't download anything.",
+    )
+    parser.add_argument(
+        "--verify-library",
+        action="store_true",
+        help="Verify the episodes in the Plex library that have changed since they were last verified.",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and check for new episodes at the interval under [Daemon] in the configuration.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the run with cProfile and print the slowest functions at the end.",
+    )
 
     return parser.parse_args()
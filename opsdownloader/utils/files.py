@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+from tealprint import TealPrint
+
+_chunk_size = 8 * 1024 * 1024
+
+T = TypeVar("T")
+
+
+def same_filesystem(a: Path, b: Path) -> bool:
+    """Check if two existing paths are on the same filesystem, i.e. a rename between them is possible"""
+    return a.stat().st_dev == b.stat().st_dev
+
+
+def atomic_move(src: Path, dst: Path) -> int:
+    """Move a file so that dst never exists as a partially written file.
+
+    Renames when src and dst are on the same filesystem. Otherwise copies to a hidden
+    temporary file next to dst, syncs it to disk and then renames it into place.
+
+    Returns:
+        Number of bytes that had to be copied, 0 if the file was renamed
+    """
+    if same_filesystem(src, dst.parent):
+        os.replace(src, dst)
+        return 0
+
+    tmp = dst.with_name(f".{dst.name}.partial")
+    try:
+        copied = _copy(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    _fsync_dir(dst.parent)
+    src.unlink()
+    return copied
+
+
+def write_atomic(path: Path, content: str, mode: Optional[int] = None) -> None:
+    """Write to a temporary file next to path and rename it into place, so that a crash never leaves a
+    half written file.
+
+    Args:
+        mode (int): Permissions of the file, e.g. 0o600 for files with credentials
+    """
+    tmp = path.with_name(f"{path.name}.tmp")
+    try:
+        tmp.write_text(content, encoding="utf-8")
+        if mode is not None:
+            tmp.chmod(mode)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def save_json(path: Path, data: Any, name: str, version: Optional[int] = None) -> None:
+    """Write data as compact JSON with write_atomic(). Prints a warning instead of raising when it fails.
+
+    Args:
+        name (str): What the file contains, used in the warning
+        version (int): Stored in the file so that load_json() can skip files in an older format
+    """
+    if version is not None:
+        data = {"version": version, **data}
+
+    try:
+        write_atomic(path, json.dumps(data, separators=(",", ":")))
+    except OSError as e:
+        TealPrint.warning(f"Could not save {name}; {e}")
+
+
+def load_json(path: Path, name: str, parse: Callable[[Any], Optional[T]], version: Optional[int] = None) -> Optional[T]:
+    """Read a file written by save_json() and convert it with parse.
+
+    Args:
+        name (str): What the file contains, used in the warning
+        parse (Callable[[Any], Optional[T]]): Converts the JSON data. Errors from a file with unexpected
+            content (ValueError, KeyError, IndexError and TypeError) are caught
+        version (int): Skip the file when it was saved with another version
+
+    Returns:
+        None if the file doesn't exist, is invalid or has another version
+    """
+    if not path.exists():
+        return None
+
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if version is not None and data["version"] != version:
+            return None
+        return parse(data)
+    except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+        TealPrint.warning(f"Ignoring invalid {name} {path}; {e}")
+        return None
+
+
+def _copy(src: Path, dst: Path) -> int:
+    """Copy in the kernel with copy_file_range() or sendfile() when available"""
+    size = src.stat().st_size
+    copied = 0
+
+    with src.open("rb") as in_file, dst.open("wb") as out_file:
+        in_fd = in_file.fileno()
+        out_fd = out_file.fileno()
+
+        try:
+            if hasattr(os, "copy_file_range"):
+                while copied < size:
+                    sent = os.copy_file_range(in_fd, out_fd, min(_chunk_size, size - copied))
+                    if sent == 0:
+                        break
+                    copied += sent
+            elif hasattr(os, "sendfile"):
+                while copied < size:
+                    sent = os.sendfile(out_fd, in_fd, copied, min(_chunk_size, size - copied))
+                    if sent == 0:
+                        break
+                    copied += sent
+        except OSError:
+            # Not supported between these filesystems, continue with a regular copy
+            pass
+
+        if copied < size:
+            in_file.seek(copied)
+            out_file.seek(copied)
+            shutil.copyfileobj(in_file, out_file, _chunk_size)
+            copied = size
+
+        out_file.flush()
+        os.fsync(out_fd)
+
+    return copied
+
+
+def _fsync_dir(dir: Path) -> None:
+    """Make sure a rename in the directory is stored on disk"""
+    try:
+        fd = os.open(dir, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
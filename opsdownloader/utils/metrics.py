@@ -0,0 +1,150 @@
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterator, List, Optional
+
+from tealprint import TealPrint
+
+from ..core.episode import Episode
+from .files import write_atomic
+
+
+class Measurement:
+    def __init__(self, stage: str, episode: Optional[Episode]) -> None:
+        self.stage = stage
+        self.episode = episode
+        self.started = time.time()
+        self.duration = 0.0
+        self.bytes = 0
+        self.retries = 0
+        self.ok = True
+
+    def to_dict(self) -> Dict:
+        return {
+            "stage": self.stage,
+            "type": self.episode.type.value if self.episode else None,
+            "ops": self.episode.ops.number if self.episode else None,
+            "title": self.episode.title if self.episode else None,
+            "started": self.started,
+            "duration": self.duration,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "ok": self.ok,
+        }
+
+
+class Metrics:
+    """Records durations, bytes and retries for each stage and episode"""
+
+    def __init__(self) -> None:
+        self.measurements: List[Measurement] = []
+        self._retries: Dict[str, int] = {}
+        self._lock = Lock()
+
+    @contextmanager
+    def measure(self, stage: str, episode: Optional[Episode] = None) -> Iterator[Measurement]:
+        """Measure the time of the with-block. Set bytes on the yielded measurement to record throughput"""
+        measurement = Measurement(stage, episode)
+        try:
+            yield measurement
+        except BaseException:
+            measurement.ok = False
+            raise
+        finally:
+            measurement.duration = time.time() - measurement.started
+            with self._lock:
+                measurement.retries = self._retries.pop(Metrics._retry_key(stage, episode), 0)
+                self.measurements.append(measurement)
+
+    def retry(self, stage: str, episode: Optional[Episode] = None) -> None:
+        """Count a retry of the stage, it's added to the stage's next measurement"""
+        with self._lock:
+            key = Metrics._retry_key(stage, episode)
+            self._retries[key] = self._retries.get(key, 0) + 1
+
+    def clear(self) -> None:
+        """Forget all measurements, e.g. after each poll of the daemon"""
+        with self._lock:
+            self.measurements = []
+            self._retries = {}
+
+    def write(self, path: Path) -> None:
+        """Write all measurements. Uses the Prometheus textfile format for .prom files, else JSONL"""
+        with self._lock:
+            if path.suffix == ".prom":
+                content = self._to_prometheus()
+            else:
+                content = "".join(json.dumps(measurement.to_dict()) + "\n" for measurement in self.measurements)
+
+        try:
+            write_atomic(path, content)
+        except OSError as e:
+            TealPrint.warning(f"Could not write metrics to {path}; {e}")
+
+    def print_summary(self) -> None:
+        with self._lock:
+            stages = self._summarize()
+        if not stages:
+            return
+
+        TealPrint.info(
+            f"{'Stage':<20} {'Count':>5} {'Total s':>9} {'Avg s':>8} {'Max s':>8} "
+            + f"{'MiB':>9} {'MiB/s':>7} {'Retries':>7}"
+        )
+        for stage, summary in stages.items():
+            mib = summary["bytes"] / 1024**2
+            speed = mib / summary["duration"] if summary["duration"] > 0 else 0
+            TealPrint.info(
+                f"{stage:<20} {summary['count']:>5} {summary['duration']:>9.1f} "
+                + f"{summary['duration'] / summary['count']:>8.2f} {summary['max']:>8.2f} "
+                + f"{mib:>9.1f} {speed:>7.1f} {summary['retries']:>7}"
+            )
+
+    def _summarize(self) -> Dict[str, Dict]:
+        """Sum up the measurements for each stage. Has to be called with the lock held"""
+        stages: Dict[str, Dict] = {}
+        for measurement in self.measurements:
+            summary = stages.setdefault(
+                measurement.stage, {"count": 0, "duration": 0.0, "max": 0.0, "bytes": 0, "retries": 0, "failed": 0}
+            )
+            summary["count"] += 1
+            summary["duration"] += measurement.duration
+            summary["max"] = max(summary["max"], measurement.duration)
+            summary["bytes"] += measurement.bytes
+            summary["retries"] += measurement.retries
+            summary["failed"] += 0 if measurement.ok else 1
+        return stages
+
+    def _to_prometheus(self) -> str:
+        lines = [
+            "# HELP ops_downloader_stage_seconds_total Time spent in each stage during the last run",
+            "# TYPE ops_downloader_stage_seconds_total gauge",
+        ]
+        stages = self._summarize()
+        for stage, summary in stages.items():
+            lines.append(f'ops_downloader_stage_seconds_total{{stage="{stage}"}} {summary["duration"]:.3f}')
+        for name, key, help in [
+            ("stage_runs_total", "count", "Number of times each stage ran"),
+            ("stage_bytes_total", "bytes", "Bytes written by each stage"),
+            ("stage_retries_total", "retries", "Retries in each stage"),
+            ("stage_failures_total", "failed", "Failures in each stage"),
+        ]:
+            lines.append(f"# HELP ops_downloader_{name} {help} during the last run")
+            lines.append(f"# TYPE ops_downloader_{name} gauge")
+            for stage, summary in stages.items():
+                lines.append(f'ops_downloader_{name}{{stage="{stage}"}} {summary[key]}')
+        lines.append("# HELP ops_downloader_last_run_timestamp_seconds When the last run finished")
+        lines.append("# TYPE ops_downloader_last_run_timestamp_seconds gauge")
+        lines.append(f"ops_downloader_last_run_timestamp_seconds {time.time():.0f}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _retry_key(stage: str, episode: Optional[Episode]) -> str:
+        if episode:
+            return f"{stage}/{episode.type.value}/{episode.ops.url}"
+        return stage
+
+
+metrics = Metrics()
@@ -0,0 +1,234 @@
+import random
+import time
+from threading import Lock
+from typing import Callable, Dict, Optional, TypeVar
+from urllib.parse import urlparse
+
+import requests
+from tealprint import TealPrint
+
+from ..config import config
+from ..core.episode import Episode
+from .metrics import metrics
+
+T = TypeVar("T")
+
+# HTTP status codes that can succeed when the request is sent again
+_transient_statuses = [408, 425, 429]
+# Exceptions from these modules are raised for page loads and downloads, which usually work on the next try
+_transient_modules = ["selenium.", "yt_dlp."]
+
+
+class TransientError(Exception):
+    """An error that is likely to go away when the same thing is tried again, e.g. a page that didn't load"""
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def is_transient(error: BaseException) -> bool:
+    """If it's worth retrying after the error. Everything that isn't known to be temporary, e.g. a file
+    that ffmpeg can't read or a failed verification, fails the same way the next time"""
+    if isinstance(error, TransientError):
+        return True
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else 0
+        return status in _transient_statuses or status >= 500 or status == 0
+    if isinstance(error, requests.RequestException):
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(type(error).__module__.startswith(module) for module in _transient_modules)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter, so that retries of several episodes don't happen at the same time
+
+    Args:
+        attempt (int): Number of retries before this one, starting at 0
+        base (float): Max seconds before the first retry, doubled for each retry
+        cap (float): Max seconds before any retry
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class TokenBucket:
+    """Allows rate requests per second on average, and up to burst requests at once after being idle"""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self) -> None:
+        """Take a token, sleeps until one is available"""
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now so that other threads queue up behind us
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """One token bucket for each host, with the rate from the [Retry] configuration"""
+
+    def __init__(self) -> None:
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = Lock()
+
+    def throttle(self, url: str) -> None:
+        host = urlparse(url).hostname or ""
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(config.retry.host_rate, config.retry.host_burst)
+            bucket = self._buckets[host]
+        bucket.acquire()
+
+
+class CircuitBreaker:
+    """Stops calling a host that keeps failing.
+
+    Opens after the given number of failures in a row, then fails fast until reset_after seconds have
+    passed. After that a single call is let through to test the host; it closes the circuit when it
+    succeeds and opens it again when it fails.
+    """
+
+    def __init__(self, name: str, failures: int, reset_after: float) -> None:
+        self.name = name
+        self.failures = failures
+        self.reset_after = reset_after
+        self._failed = 0
+        self._opened_at: Optional[float] = None
+        self._testing = False
+        self._lock = Lock()
+
+    def before(self) -> bool:
+        """Raises CircuitOpenError if the call shouldn't be made
+
+        Returns:
+            True if the call tests the host after a pause, settle() has to be called when it's done
+        """
+        if self.failures <= 0:
+            return False
+
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if self._testing or time.monotonic() - self._opened_at < self.reset_after:
+                raise CircuitOpenError(f"Too many failures for {self.name}, skipping it for now")
+            self._testing = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self._failed = 0
+            self._opened_at = None
+            self._testing = False
+
+    def failure(self) -> None:
+        if self.failures <= 0:
+            return
+
+        with self._lock:
+            self._failed += 1
+            if self._testing or self._failed >= self.failures:
+                if self._opened_at is None:
+                    TealPrint.warning(f"Too many failures for {self.name}, pausing it for {self.reset_after:.0f}s")
+                self._opened_at = time.monotonic()
+                self._testing = False
+
+    def settle(self) -> None:
+        """Counts the test call as failed if it ended without success() or failure(), e.g. with an error
+        that isn't transient. Otherwise the circuit would stay open forever"""
+        with self._lock:
+            if self._testing:
+                self._failed += 1
+                self._opened_at = time.monotonic()
+                self._testing = False
+
+
+class RetryPolicy:
+    """Retries transient errors with backoff, and keeps one circuit breaker for each host
+
+    Args:
+        attempts (int): Max number of tries, 1 means no retries
+        backoff (float): Max seconds before the first retry, doubled for each retry
+        max_backoff (float): Max seconds before any retry
+        breaker_failures (int): Number of failures in a row before a host is paused, 0 to never pause
+        breaker_reset (float): Seconds a host is paused before it's tried again
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        backoff: float = 2.0,
+        max_backoff: float = 60.0,
+        breaker_failures: int = 5,
+        breaker_reset: float = 300.0,
+    ) -> None:
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = Lock()
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        return attempt + 1 < self.attempts and is_transient(error)
+
+    def delay(self, attempt: int) -> float:
+        return backoff_delay(attempt, self.backoff, self.max_backoff)
+
+    def attempt(self, host: str, func: Callable[[], T]) -> T:
+        """Call func once through the circuit breaker of the host. An empty host has no circuit breaker"""
+        if not host:
+            return func()
+
+        breaker = self._breaker(host)
+        probe = breaker.before()
+        try:
+            result = func()
+            breaker.success()
+            return result
+        except Exception as e:
+            if is_transient(e):
+                breaker.failure()
+            raise
+        finally:
+            if probe:
+                breaker.settle()
+
+    def call(self, stage: str, func: Callable[[], T], episode: Optional[Episode] = None, host: str = "") -> T:
+        """Call func and retry it until it succeeds, the error isn't transient or there are no attempts left"""
+        attempt = 0
+        while True:
+            try:
+                return self.attempt(host, func)
+            except Exception as e:
+                if not self.should_retry(e, attempt):
+                    raise
+                delay = self.delay(attempt)
+                TealPrint.warning(f"{stage} failed, retrying in {delay:.0f}s; {e}")
+                metrics.retry(stage, episode)
+                attempt += 1
+                time.sleep(delay)
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host, self.breaker_failures, self.breaker_reset)
+            return self._breakers[host]
+
+
+rate_limiter = HostRateLimiter()
@@ -24,12 +24,13 @@ setup(
         "tealprint==0.3.0",
         "blulib",
         "selenium",
+        "requests",
         "chromedriver-autoinstaller",
         "yt-dlp",
         "ffmpeg-python",
         "dataclasses",
-        "autosub",
     ],
+    extras_require={"subtitles": ["faster-whisper"]},
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "Environment :: Console",
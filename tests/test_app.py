@@ -0,0 +1,78 @@
+from pathlib import Path
+
+from mockito import mock, unstub, verify, verifyZeroInteractions, when
+
+from opsdownloader.app import app as app_module
+from opsdownloader.app.app import App
+from opsdownloader.core.episode import Episode
+from opsdownloader.core.type import Types
+from opsdownloader.gateways.journal import Journal
+
+
+def episode(file: Path) -> Episode:
+    episode = Episode()
+    episode.type = Types.QA
+    episode.title = "a"
+    episode.ops.number = 225.0
+    episode.ops.url = "https://example.com/video/a"
+    episode.file = file
+    return episode
+
+
+def app(tmp_path: Path) -> App:
+    app = App.__new__(App)
+    app.journal = Journal(tmp_path / "journal.jsonl")
+    app.url_cache = mock()
+    return app
+
+
+def test_skip_the_download_url_when_the_journal_has_a_later_stage(tmp_path: Path):
+    file = tmp_path / "a.mp4"
+    file.touch()
+    downloaded = episode(file)
+    downloaded.ops.download_url = "https://cdn.example.com/a.mpd"
+    Journal(tmp_path / "journal.jsonl").record(downloaded, "rerender")
+
+    ops = mock()
+    resumed = episode(Path(""))
+    app(tmp_path)._cached_download_url(ops)(resumed)
+
+    assert resumed.ops.download_url == "https://cdn.example.com/a.mpd"
+    assert resumed.file == file
+    verifyZeroInteractions(ops)
+
+
+def test_get_the_download_url_from_ops_when_not_downloaded(tmp_path: Path):
+    a = app(tmp_path)
+    ops = mock()
+    when(a.url_cache).get(...).thenReturn(None)
+    when(a.url_cache).put(...).thenReturn(None)
+
+    def resolve(episode: Episode) -> None:
+        episode.ops.download_url = "https://cdn.example.com/a.mpd"
+
+    when(ops).get_download_url(...).thenAnswer(resolve)
+
+    try:
+        a._cached_download_url(ops)(episode(Path("")))
+        verify(a.url_cache).put("https://example.com/video/a", "https://cdn.example.com/a.mpd")
+    finally:
+        unstub()
+
+
+def test_stage_downloads_in_plex_when_scratch_dir_is_not_set(tmp_path: Path):
+    assert App._scratch_dir(Path(""), tmp_path) == tmp_path / ".ops-downloader-scratch"
+    assert (tmp_path / ".ops-downloader-scratch").is_dir()
+
+
+def test_use_scratch_dir_on_the_same_filesystem(tmp_path: Path):
+    assert App._scratch_dir(tmp_path / "scratch", tmp_path) == tmp_path / "scratch"
+
+
+def test_stage_downloads_in_plex_when_scratch_dir_is_on_another_filesystem(tmp_path: Path):
+    when(app_module).same_filesystem(...).thenReturn(False)
+
+    try:
+        assert App._scratch_dir(tmp_path / "scratch", tmp_path) == tmp_path / ".ops-downloader-scratch"
+    finally:
+        unstub()
@@ -0,0 +1,67 @@
+"""Runs the offline benchmarks as tests. The smoke test always runs, the timed scenarios need pytest-benchmark
+and can be compared to an earlier run with --benchmark-autosave and --benchmark-compare"""
+
+from pathlib import Path
+
+import pytest
+
+from opsdownloader.benchmark.__main__ import Benchmark
+from opsdownloader.benchmark.fixtures import FixtureServer
+from opsdownloader.config import config
+
+
+@pytest.fixture(scope="module")
+def server():
+    with FixtureServer(episodes=50, segments=4, segment_size=64 * 1024) as server:
+        yield server
+
+
+@pytest.fixture
+def bench(server: FixtureServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Benchmark:
+    # Keep the caches, session and Plex index of the benchmark away from the real ones
+    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    # The fake site is local, measure the app instead of the request rate limit
+    monkeypatch.setattr(config.retry, "host_rate", 0)
+    return Benchmark(server, tmp_path, rounds=1, pipeline_episodes=2)
+
+
+@pytest.fixture
+def timer(request: pytest.FixtureRequest):
+    if not request.config.pluginmanager.hasplugin("benchmark"):
+        pytest.skip("pytest-benchmark isn't installed")
+    return request.getfixturevalue("benchmark")
+
+
+def test_all_scenarios_run(bench: Benchmark):
+    bench.run()
+
+    assert [result.name for result in bench.results] == [
+        "Parse library page",
+        "Resolve download URLs",
+        "Download",
+        "Finalize",
+        "Run pipeline",
+    ]
+    assert all(len(result.times) == 1 for result in bench.results)
+    # Two new episodes moved to Plex in the warm up and the timed round
+    assert len(list(bench.dir.glob("pipeline-*/plex/*/Season */*.mp4"))) == 4
+
+
+def test_parse_library_page(timer, bench: Benchmark):
+    timer(bench._parse_library)
+
+
+def test_resolve_download_urls(timer, bench: Benchmark):
+    timer.pedantic(bench._resolve_urls, rounds=3)
+
+
+def test_download(timer, bench: Benchmark):
+    timer.pedantic(bench._download, setup=lambda: ((bench._resolved_episode(),), {}), rounds=3)
+
+
+def test_finalize(timer, bench: Benchmark):
+    timer.pedantic(bench._finalize, setup=lambda: ((bench._downloaded_episode(),), {}), rounds=3)
+
+
+def test_run_pipeline(timer, bench: Benchmark):
+    timer.pedantic(bench._run_pipeline, setup=lambda: ((bench._new_episodes(),), {}), rounds=2)
@@ -0,0 +1,74 @@
+from pathlib import Path
+
+from opsdownloader.core.episode import Episode
+from opsdownloader.core.type import Types
+from opsdownloader.gateways.catalog import Catalog
+
+
+def episode(type: Types, number: float, title: str = "") -> Episode:
+    episode = Episode()
+    episode.type = type
+    episode.title = title or f"{type.value} {number}"
+    episode.ops.number = number
+    episode.ops.url = f"https://example.com/video/{episode.title}"
+    return episode
+
+
+def test_merge_overlapping_listings_extends_the_complete_range(tmp_path: Path):
+    catalog = Catalog(tmp_path / "catalog.json")
+    catalog.merge([episode(Types.QA, 10), episode(Types.QA, 11)], 10, 11)
+    catalog.merge([episode(Types.QA, 11), episode(Types.QA, 12)], 11, 12)
+
+    assert (catalog.complete_from, catalog.complete_to) == (10, 12)
+    assert len(catalog) == 3
+
+
+def test_merge_newer_listing_that_is_not_connected_replaces_the_range(tmp_path: Path):
+    catalog = Catalog(tmp_path / "catalog.json")
+    catalog.merge([episode(Types.QA, 10)], 10, 11)
+    catalog.merge([episode(Types.QA, 20)], 20, 21)
+
+    assert (catalog.complete_from, catalog.complete_to) == (20, 21)
+
+
+def test_covers(tmp_path: Path):
+    catalog = Catalog(tmp_path / "catalog.json")
+    assert not catalog.covers({Types.QA: episode(Types.QA, 12)})
+
+    catalog.merge([episode(Types.QA, 10), episode(Types.CLASS, 11)], 10, 12)
+
+    assert catalog.covers({Types.QA: episode(Types.QA, 12), Types.CLASS: episode(Types.CLASS, 10)})
+    assert not catalog.covers({Types.QA: episode(Types.QA, 12), Types.CLASS: episode(Types.CLASS, 9)})
+
+
+def test_newer_than_includes_episodes_with_the_same_number(tmp_path: Path):
+    catalog = Catalog(tmp_path / "catalog.json")
+    catalog.merge(
+        [episode(Types.QA, 225, "a"), episode(Types.QA, 225, "b"), episode(Types.QA, 226), episode(Types.CLASS, 226)],
+        225,
+        226,
+    )
+
+    assert [e.title for e in catalog.newer_than(Types.QA, 224)] == ["a", "b", "OP QA 226"]
+    assert [e.title for e in catalog.newer_than(Types.QA, 225)] == ["OP QA 226"]
+
+
+def test_save_and_load(tmp_path: Path):
+    catalog = Catalog(tmp_path / "catalog.json")
+    catalog.merge([episode(Types.QA, 10), episode(Types.CLASS, 11)], 10, 11)
+    catalog.save()
+
+    loaded = Catalog(tmp_path / "catalog.json")
+
+    assert (loaded.complete_from, loaded.complete_to) == (10, 11)
+    assert [e.title for e in loaded.newer_than(Types.CLASS, 0)] == ["OP Class 11"]
+
+
+def test_ignore_invalid_file(tmp_path: Path):
+    path = tmp_path / "catalog.json"
+    path.write_text('{"version": 1, "episodes": [["Not a type", 1, "", ""]]}')
+
+    catalog = Catalog(path)
+
+    assert len(catalog) == 0
+    assert catalog.complete_to == 0
@@ -0,0 +1,122 @@
+import base64
+from pathlib import Path
+from typing import List
+
+import pytest
+import requests
+
+from opsdownloader.benchmark.fixtures import FixtureServer
+from opsdownloader.gateways.dash import DashFetcher, Manifest, Representation, Segment
+
+_master_url = "https://vod.example.com/exp=1~hmac=abc/video/1/sep/master.json?base64_init=1"
+
+
+def representation(sizes: List[int], init: bytes = b"init", **data) -> Representation:
+    segments = [{"url": f"segment-{i}.m4s", "size": size} for i, size in enumerate(sizes)]
+    return Representation(
+        {"base_url": "video/", "init_segment": base64.b64encode(init).decode(), "segments": segments, **data},
+        "https://vod.example.com/exp=1~hmac=abc/video/1/sep/",
+    )
+
+
+class FakeSegments(DashFetcher):
+    """Every segment is filled with its own index, so it's easy to see where it was written"""
+
+    def __init__(self, fail: bool = False) -> None:
+        super().__init__(connections=4, retries=0)
+        self.fetched: List[int] = []
+        self.fail = fail
+
+    def _get_segment(self, segment: Segment) -> bytes:
+        index = int(segment.url.split("-")[-1].split(".")[0])
+        if self.fail and index == 2:
+            raise requests.RequestException("Connection reset")
+        self.fetched.append(index)
+        return bytes([index + 1]) * segment.size
+
+
+def test_segment_urls_and_offsets():
+    video = representation([10, 20, 5])
+
+    assert [segment.url for segment in video.segments] == [
+        "https://vod.example.com/exp=1~hmac=abc/video/1/sep/video/segment-0.m4s",
+        "https://vod.example.com/exp=1~hmac=abc/video/1/sep/video/segment-1.m4s",
+        "https://vod.example.com/exp=1~hmac=abc/video/1/sep/video/segment-2.m4s",
+    ]
+    assert [segment.offset for segment in video.segments] == [4, 14, 34]
+    assert video.size == 39
+
+
+def test_best_streams():
+    def stream(mime_type: str, height: int, bitrate: int):
+        return {"mime_type": mime_type, "height": height, "bitrate": bitrate, "segments": []}
+
+    manifest = Manifest(
+        _master_url,
+        {
+            "video": [stream("video/mp4", 720, 3000), stream("video/mp4", 1080, 2000), stream("video/webm", 2160, 1)],
+            "audio": [stream("audio/mp4", 0, 128), stream("audio/mp4", 0, 256)],
+        },
+    )
+
+    best_video = manifest.best_video()
+    best_audio = manifest.best_audio()
+    assert best_video and best_video.height == 1080
+    assert best_audio and best_audio.bitrate == 256
+
+
+def test_mpd_to_master_json():
+    assert DashFetcher._mpd_to_master_json("https://a/master.mpd") == "https://a/master.json?base64_init=1"
+    assert DashFetcher._mpd_to_master_json("https://a/master.mpd?x=1") == "https://a/master.json?base64_init=1&x=1"
+    assert DashFetcher._mpd_to_master_json("https://a/video.mp4") is None
+
+
+def test_write_segments_at_their_offset(tmp_path: Path):
+    video = representation([3, 2, 4])
+    file = tmp_path / "video.mp4"
+
+    FakeSegments().fetch_representation(video, file)
+
+    assert file.read_bytes() == b"init" + b"\x01" * 3 + b"\x02" * 2 + b"\x03" * 4
+    assert not (tmp_path / "video.mp4.done").exists()
+
+
+def test_resume_only_fetches_missing_segments(tmp_path: Path):
+    video = representation([3, 2, 4, 1])
+    file = tmp_path / "video.mp4"
+
+    with pytest.raises(requests.RequestException):
+        FakeSegments(fail=True).fetch_representation(video, file)
+    assert (tmp_path / "video.mp4.done").exists()
+
+    fetcher = FakeSegments()
+    fetcher.fetch_representation(video, file)
+
+    assert fetcher.fetched == [2]
+    assert file.read_bytes() == b"init" + b"\x01" * 3 + b"\x02" * 2 + b"\x03" * 4 + b"\x04"
+
+
+def test_start_over_when_the_file_has_another_size(tmp_path: Path):
+    video = representation([3, 2])
+    file = tmp_path / "video.mp4"
+    file.write_bytes(b"old")
+    (tmp_path / "video.mp4.done").write_text("0\n1\n")
+
+    fetcher = FakeSegments()
+    fetcher.fetch_representation(video, file)
+
+    assert sorted(fetcher.fetched) == [0, 1]
+    assert file.read_bytes() == b"init" + b"\x01" * 3 + b"\x02" * 2
+
+
+def test_fetch_from_server(tmp_path: Path):
+    with FixtureServer(episodes=1, segments=5, segment_size=32 * 1024) as server:
+        fetcher = DashFetcher(connections=3)
+        files = fetcher.fetch(f"{server.url}/master/1000.mpd", tmp_path)
+        fetcher.close()
+
+        assert files
+        video_file, audio_file, _ = files
+        assert video_file.stat().st_size == 1024 + 5 * 32 * 1024
+        assert audio_file.stat().st_size == 1024 + 5 * 4 * 1024
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["audio.m4a", "video.mp4"]
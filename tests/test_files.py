@@ -0,0 +1,73 @@
+import os
+from pathlib import Path
+
+import pytest
+from mockito import unstub, when
+
+from opsdownloader.utils import files
+from opsdownloader.utils.files import atomic_move, load_json, save_json, write_atomic
+
+
+@pytest.fixture(autouse=True)
+def cleanup():
+    yield
+    unstub()
+
+
+def test_atomic_move_renames_on_the_same_filesystem(tmp_path: Path):
+    src = tmp_path / "src.mp4"
+    src.write_bytes(b"video")
+    (tmp_path / "plex").mkdir()
+    dst = tmp_path / "plex" / "dst.mp4"
+
+    assert atomic_move(src, dst) == 0
+    assert dst.read_bytes() == b"video"
+    assert not src.exists()
+
+
+def test_atomic_move_copies_between_filesystems(tmp_path: Path):
+    when(files).same_filesystem(...).thenReturn(False)
+    content = os.urandom(3 * 1024 * 1024 + 17)
+    src = tmp_path / "src.mp4"
+    src.write_bytes(content)
+    (tmp_path / "plex").mkdir()
+    dst = tmp_path / "plex" / "dst.mp4"
+
+    assert atomic_move(src, dst) == len(content)
+    assert dst.read_bytes() == content
+    assert not src.exists()
+    assert list((tmp_path / "plex").iterdir()) == [dst]
+
+
+def test_atomic_move_leaves_no_partial_file_when_the_copy_fails(tmp_path: Path):
+    when(files).same_filesystem(...).thenReturn(False)
+    when(files)._copy(...).thenRaise(OSError("No space left on device"))
+    src = tmp_path / "src.mp4"
+    src.write_bytes(b"video")
+    (tmp_path / "plex").mkdir()
+
+    with pytest.raises(OSError):
+        atomic_move(src, tmp_path / "plex" / "dst.mp4")
+    assert src.exists()
+    assert list((tmp_path / "plex").iterdir()) == []
+
+
+def test_write_atomic_sets_the_mode(tmp_path: Path):
+    write_atomic(tmp_path / "session.json", "{}", 0o600)
+
+    assert (tmp_path / "session.json").stat().st_mode & 0o777 == 0o600
+    assert list(tmp_path.iterdir()) == [tmp_path / "session.json"]
+
+
+def test_save_and_load_json_with_version(tmp_path: Path):
+    save_json(tmp_path / "index.json", {"files": [1, 2]}, "index", version=2)
+
+    assert load_json(tmp_path / "index.json", "index", lambda data: data["files"], version=2) == [1, 2]
+    assert load_json(tmp_path / "index.json", "index", lambda data: data["files"], version=3) is None
+
+
+def test_load_invalid_json(tmp_path: Path):
+    (tmp_path / "index.json").write_text("{")
+
+    assert load_json(tmp_path / "index.json", "index", lambda data: data) is None
+    assert load_json(tmp_path / "missing.json", "index", lambda data: data) is None
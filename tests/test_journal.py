@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+
+from opsdownloader.core.episode import Episode
+from opsdownloader.core.type import Types
+from opsdownloader.gateways.journal import Journal
+
+
+def episode(title: str, file: Path) -> Episode:
+    episode = Episode()
+    episode.type = Types.QA
+    episode.title = title
+    episode.ops.number = 225.0
+    episode.ops.url = f"https://example.com/video/{title}"
+    episode.ops.download_url = f"https://cdn.example.com/{title}.mp4"
+    episode.file = file
+    return episode
+
+
+def test_restore_completed_stage(tmp_path: Path):
+    file = tmp_path / "a.mp4"
+    file.touch()
+    Journal(tmp_path / "journal.jsonl").record(episode("a", file), "download")
+
+    restored = episode("a", Path(""))
+    restored.ops.download_url = ""
+    journal = Journal(tmp_path / "journal.jsonl")
+
+    assert journal.restore(restored, "download")
+    assert restored.file == file
+    assert restored.ops.download_url == "https://cdn.example.com/a.mp4"
+    assert not journal.restore(restored, "rerender")
+
+
+def test_dont_restore_when_the_file_is_gone(tmp_path: Path):
+    Journal(tmp_path / "journal.jsonl").record(episode("a", tmp_path / "a.mp4"), "download")
+
+    assert not Journal(tmp_path / "journal.jsonl").restore(episode("a", Path("")), "download")
+
+
+def test_episodes_with_the_same_number_are_kept_apart(tmp_path: Path):
+    a = tmp_path / "a.mp4"
+    b = tmp_path / "b.mp4"
+    a.touch()
+    b.touch()
+    journal = Journal(tmp_path / "journal.jsonl")
+    journal.record(episode("a", a), "download")
+    journal.record(episode("b", b), "rerender")
+
+    journal = Journal(tmp_path / "journal.jsonl")
+    restored = episode("a", Path(""))
+    assert journal.restore(restored, "download")
+    assert not journal.restore(restored, "rerender")
+    assert restored.file == a
+
+
+def test_compact_finished_and_invalid_lines(tmp_path: Path):
+    path = tmp_path / "journal.jsonl"
+    file = tmp_path / "a.mp4"
+    file.touch()
+    journal = Journal(path)
+    journal.record(episode("a", file), "download")
+    journal.record(episode("b", file), "download")
+    journal.record(episode("b", file), "move")
+    with path.open("a") as f:
+        # Partially written line from a crash
+        f.write('{"type": "OP QA", "sta')
+
+    Journal(path)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(line["url"], line["stage"]) for line in lines] == [("https://example.com/video/a", "download")]
+
+
+def test_dont_restore_subtitles_when_the_downloaded_file_is_gone(tmp_path: Path):
+    subtitles = tmp_path / "a.srt"
+    subtitles.touch()
+    done = episode("a", tmp_path / "a.mp4")
+    done.subtitles = subtitles
+    Journal(tmp_path / "journal.jsonl").record(done, "subtitles")
+
+    assert not Journal(tmp_path / "journal.jsonl").restore(episode("a", Path("")), "subtitles")
@@ -0,0 +1,72 @@
+import json
+from typing import Any, Dict
+
+from mockito import mock, when
+
+from opsdownloader.gateways.network_collector import NetworkCollector
+
+_player = "https://player.vimeo.com/video/1"
+
+
+def entry(url: str, document_url: str = _player, method: str = "Network.requestWillBeSent") -> Dict[str, Any]:
+    message = {"message": {"method": method, "params": {"documentURL": document_url, "request": {"url": url}}}}
+    return {"message": json.dumps(message)}
+
+
+def collector(*logs):
+    driver = mock()
+    when(driver).get_log("performance").thenReturn(*logs, [])
+    return NetworkCollector(driver, max_entries=2)
+
+
+def test_master_json_of_the_document():
+    network = collector(
+        [
+            entry("https://vod.example.com/a/master.json?base64_init=1", "https://player.vimeo.com/video/0"),
+            entry("https://vod.example.com/b/master.json?base64_init=1"),
+        ]
+    )
+
+    assert network.master_json(_player) == "https://vod.example.com/b/master.json?base64_init=1"
+    assert (
+        network.master_json("https://player.vimeo.com/video/0") == "https://vod.example.com/a/master.json?base64_init=1"
+    )
+
+
+def test_first_master_json_of_the_page_for_another_document():
+    network = collector(
+        [entry("https://vod.example.com/a/master.json"), entry("https://vod.example.com/b/master.json")]
+    )
+
+    assert network.master_json("https://player.vimeo.com/video/2") == "https://vod.example.com/a/master.json"
+    assert network.master_json() == "https://vod.example.com/a/master.json"
+
+
+def test_skip_other_requests_and_events():
+    network = collector(
+        [
+            entry("https://vod.example.com/a/segment.m4s"),
+            entry("https://vod.example.com/a/master.json", method="Network.responseReceived"),
+        ]
+    )
+
+    assert network.master_json(_player) is None
+
+
+def test_requests_before_a_new_page_belong_to_the_old_page():
+    network = collector([entry("https://vod.example.com/a/master.json", "https://player.vimeo.com/video/0")])
+    network.new_page()
+
+    assert network.master_json() is None
+    assert network.master_json("https://player.vimeo.com/video/0") == "https://vod.example.com/a/master.json"
+
+
+def test_forget_the_oldest_documents():
+    network = collector(
+        [entry(f"https://vod.example.com/{i}/master.json", f"https://player.vimeo.com/video/{i}") for i in range(3)]
+    )
+
+    assert network.master_json("https://player.vimeo.com/video/2") == "https://vod.example.com/2/master.json"
+    # Not indexed anymore, falls back to the first request of the page
+    assert network.master_json("https://player.vimeo.com/video/0") == "https://vod.example.com/0/master.json"
+    assert list(network._by_document) == ["https://player.vimeo.com/video/1", "https://player.vimeo.com/video/2"]
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pytest
+from mockito import mock, unstub, when
+
+from opsdownloader.core.episode import Episode
+from opsdownloader.core.type import Types
+from opsdownloader.gateways.catalog import Catalog
+from opsdownloader.gateways.ops import OPS
+from opsdownloader.utils.resilience import TransientError
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    yield tmp_path
+    unstub()
+
+
+def test_empty_library_is_transient_even_when_the_catalog_covers_it():
+    catalog = Catalog()
+    catalog.merge([], 220, 226)
+    catalog.save()
+
+    latest = Episode()
+    latest.type = Types.QA
+    latest.ops.number = 224
+    # Without a browser, the driver isn't used when the methods that talk to it are stubbed
+    ops = OPS.__new__(OPS)
+    when(ops).login().thenReturn(None)
+    when(ops)._get_all_episodes_on_page().thenReturn([])
+
+    with pytest.raises(TransientError):
+        ops.get_new_episodes_for_types({Types.QA: latest})
+
+
+def test_search_that_times_out_is_transient():
+    ops = OPS.__new__(OPS)
+    ops.waits = mock()
+    when(ops.waits).list_items_snapshot(...).thenReturn("OP QA 229")
+    when(ops.waits).try_until(...).thenReturn(None)
+    when(ops)._get_element(...).thenReturn(mock())
+
+    with pytest.raises(TransientError):
+        ops._search("228")
@@ -0,0 +1,93 @@
+from collections import Counter
+from pathlib import Path
+
+import pytest
+from mockito import mock, unstub, verify, when
+from tealprint import TealPrint
+
+from opsdownloader.core.episode import Episode
+from opsdownloader.core.type import Types
+from opsdownloader.gateways.catalog import Catalog
+from opsdownloader.gateways.ops_http import OPSHttp
+from opsdownloader.utils.resilience import TransientError
+
+_page = Path(__file__).parent.parent / "page.html"
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    yield tmp_path
+    unstub()
+
+
+def latest(type: Types, number: float) -> Episode:
+    episode = Episode()
+    episode.type = type
+    episode.ops.number = number
+    return episode
+
+
+def test_get_all_episodes_on_page():
+    episodes = OPSHttp()._get_all_episodes_on_page(_page.read_text(encoding="utf-8"))
+
+    assert Counter(episode.type for episode in episodes) == {Types.QA: 5, Types.CLASS: 2}
+    qa_225 = [episode for episode in episodes if episode.type == Types.QA and episode.ops.number == 225]
+    # Episodes with the same number are told apart by their video page
+    assert len({episode.ops.url for episode in qa_225}) == 4
+
+    first = episodes[0]
+    assert first.type == Types.QA
+    assert first.ops.number == 226
+    assert first.title == "Mark Miley & Critical Race Theory"
+    assert first.ops.url == "https://www.objectivepersonalitysystem.com/video/mark-miley-%26-critical-race-theory"
+
+
+def test_fall_back_to_the_browser_when_the_library_page_has_no_episodes():
+    # An earlier run listed everything up to the latest episodes
+    catalog = Catalog()
+    catalog.merge([], 220, 226)
+    catalog.save()
+
+    latest_episodes = {Types.QA: latest(Types.QA, 224), Types.CLASS: latest(Types.CLASS, 223)}
+    new_episodes = {Types.QA: [latest(Types.QA, 225)], Types.CLASS: []}
+    http = OPSHttp()
+    fallback = mock()
+    when(http)._login().thenReturn(None)
+    when(http)._get(...).thenReturn("<html>site changed</html>")
+    when(http)._get_fallback().thenReturn(fallback)
+    when(fallback).get_new_episodes_for_types(latest_episodes).thenReturn(new_episodes)
+
+    assert http.get_new_episodes_for_types(latest_episodes) == new_episodes
+    verify(fallback).get_new_episodes_for_types(latest_episodes)
+
+
+def test_use_the_catalog_after_listing_the_library_page(home: Path):
+    catalog = Catalog()
+    catalog.merge([], 200, 225)
+    catalog.save()
+
+    http = OPSHttp()
+    when(http)._login().thenReturn(None)
+    when(http)._get(...).thenReturn(_page.read_text(encoding="utf-8"))
+    when(http)._get_fallback().thenRaise(AssertionError("Shouldn't fall back to the browser"))
+
+    new_episodes = http.get_new_episodes_for_types(
+        {Types.QA: latest(Types.QA, 225), Types.CLASS: latest(Types.CLASS, 210)}
+    )
+
+    assert [episode.ops.number for episode in new_episodes[Types.QA]] == [226]
+    assert [episode.ops.number for episode in new_episodes[Types.CLASS]] == [225, 226]
+
+
+def test_indent_is_restored_when_getting_the_download_url_fails():
+    episode = latest(Types.QA, 226)
+    http = OPSHttp()
+    when(http)._get_master_json(episode).thenRaise(TransientError("Connection reset"))
+    indent = len(TealPrint._buffer.indent_stack)
+
+    for _ in range(3):
+        with pytest.raises(TransientError):
+            http.get_download_url(episode)
+
+    assert len(TealPrint._buffer.indent_stack) == indent
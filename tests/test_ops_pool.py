@@ -0,0 +1,58 @@
+from typing import List
+
+import pytest
+
+from opsdownloader.core.episode import Episode
+from opsdownloader.gateways.ops_pool import OPSPool
+from opsdownloader.utils.resilience import TransientError
+
+
+class FakeOPS:
+    def __init__(self, events: List[str], name: str) -> None:
+        self.events = events
+        self.name = name
+        self.fail_login = False
+
+    def login(self) -> None:
+        self.events.append(f"login {self.name}")
+        if self.fail_login:
+            raise TransientError("Failed to find library button")
+
+    def get_download_url(self, episode: Episode) -> None:
+        episode.ops.download_url = f"https://vimeo.com/{self.name}.mpd"
+
+
+@pytest.fixture
+def pool(monkeypatch: pytest.MonkeyPatch) -> OPSPool:
+    monkeypatch.setattr(OPSPool, "_available_memory", staticmethod(lambda: None))
+    pool = OPSPool(2)
+    pool.events = []
+
+    def create(track_idle: bool = True) -> FakeOPS:
+        ops = FakeOPS(pool.events, "primary" if len(pool._all) == 0 else "secondary")
+        pool.events.append(f"create {ops.name}")
+        pool._all.append(ops)
+        if track_idle:
+            pool._idle.put(ops)
+        return ops
+
+    monkeypatch.setattr(pool, "_create", create)
+    return pool
+
+
+def test_primary_logs_in_before_another_browser_is_started(pool: OPSPool):
+    first = pool._acquire()
+    second = pool._acquire()
+
+    assert (first.name, second.name) == ("primary", "secondary")
+    assert pool.events.index("login primary") < pool.events.index("create secondary")
+
+
+def test_no_other_browser_is_started_when_the_primary_fails_to_log_in(pool: OPSPool):
+    pool.primary.fail_login = True
+    pool.events.clear()
+
+    with pytest.raises(TransientError):
+        pool.get_download_url(Episode())
+
+    assert pool.events == ["login primary"]
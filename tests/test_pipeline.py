@@ -0,0 +1,112 @@
+import time
+from typing import List
+
+from opsdownloader.app.pipeline import Pipeline, Stage
+from opsdownloader.core.episode import Episode
+from opsdownloader.core.type import Types
+from opsdownloader.utils.resilience import RetryPolicy, TransientError
+
+
+def episode(type: Types, title: str) -> Episode:
+    episode = Episode()
+    episode.type = type
+    episode.title = title
+    episode.ops.url = f"https://example.com/video/{title}"
+    return episode
+
+
+def titles(failures: List) -> List[str]:
+    return [failure.episode.title for failure in failures]
+
+
+def test_ordered_stage_keeps_the_order_of_each_type():
+    moved: List[str] = []
+
+    def download(episode: Episode) -> None:
+        # The first episodes take the longest, so they finish downloading last
+        time.sleep(0.05 if episode.title.endswith("0") else 0.0)
+
+    pipeline = Pipeline(
+        [
+            Stage("download", download, workers=4),
+            Stage("move", lambda episode: moved.append(episode.title), ordered=True),
+        ]
+    )
+    pipeline.run([episode(Types.QA, "qa0"), episode(Types.CLASS, "class0"), episode(Types.QA, "qa1")])
+
+    assert [title for title in moved if title.startswith("qa")] == ["qa0", "qa1"]
+    assert sorted(moved) == ["class0", "qa0", "qa1"]
+    assert pipeline.failures == []
+
+
+def test_quarantine_failed_episode_and_keep_going():
+    moved: List[str] = []
+
+    def download(episode: Episode) -> None:
+        if episode.title == "class0":
+            raise ValueError("Invalid file")
+
+    pipeline = Pipeline(
+        [
+            Stage("download", download, workers=2),
+            Stage("move", lambda episode: moved.append(episode.title), ordered=True),
+        ]
+    )
+    pipeline.run([episode(Types.CLASS, "class0"), episode(Types.QA, "qa0"), episode(Types.QA, "qa1")])
+
+    assert moved == ["qa0", "qa1"]
+    assert titles(pipeline.failures) == ["class0"]
+    assert pipeline.failures[0].stage == "download"
+    assert isinstance(pipeline.failures[0].error, ValueError)
+
+
+def test_hold_back_later_episodes_of_the_same_type():
+    moved: List[str] = []
+
+    def download(episode: Episode) -> None:
+        if episode.title == "qa0":
+            raise ValueError("Invalid file")
+
+    pipeline = Pipeline(
+        [
+            Stage("download", download, workers=2),
+            Stage("move", lambda episode: moved.append(episode.title), ordered=True),
+        ]
+    )
+    pipeline.run([episode(Types.QA, "qa0"), episode(Types.QA, "qa1"), episode(Types.CLASS, "class0")])
+
+    assert moved == ["class0"]
+    assert sorted(titles(pipeline.failures)) == ["qa0", "qa1"]
+    held = [failure for failure in pipeline.failures if failure.episode.title == "qa1"][0]
+    assert held.stage == "move"
+    assert held.error is None
+
+
+def test_hold_back_when_the_ordered_stage_fails():
+    moved: List[str] = []
+
+    def move(episode: Episode) -> None:
+        if episode.title == "qa0":
+            raise OSError("Disk full")
+        moved.append(episode.title)
+
+    pipeline = Pipeline([Stage("download", lambda episode: None, workers=2), Stage("move", move, ordered=True)])
+    pipeline.run([episode(Types.QA, "qa0"), episode(Types.QA, "qa1"), episode(Types.QA, "qa2")])
+
+    assert moved == []
+    assert titles(pipeline.failures) == ["qa0", "qa1", "qa2"]
+
+
+def test_retry_transient_errors():
+    calls: List[str] = []
+
+    def download(episode: Episode) -> None:
+        calls.append(episode.title)
+        if len(calls) == 1:
+            raise TransientError("Page didn't load")
+
+    pipeline = Pipeline([Stage("download", download)], retry=RetryPolicy(attempts=2, backoff=0, breaker_failures=0))
+    pipeline.run([episode(Types.QA, "qa0")])
+
+    assert calls == ["qa0", "qa0"]
+    assert pipeline.failures == []
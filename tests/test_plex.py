@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import pytest
+
+from opsdownloader.core.episode import Episode
+from opsdownloader.core.type import Types
+from opsdownloader.gateways.plex import Plex
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    return tmp_path
+
+
+def test_move_resumed_episode_with_its_current_number(tmp_path: Path):
+    plex_dir = tmp_path / "plex"
+    plex_dir.mkdir()
+    # Rerendered in an earlier run, when it was the fifth episode of the year
+    file = tmp_path / "OP QA - s2026e005 - Title (225.0).mp4"
+    file.write_bytes(b"video")
+
+    episode = Episode()
+    episode.type = Types.QA
+    episode.title = "Title"
+    episode.season = 2027
+    episode.number = 1
+    episode.ops.number = 225.0
+    episode.file = file
+    Plex(plex_dir).move_episode(episode)
+
+    moved = plex_dir / "OP QA" / "Season 2027" / "OP QA - s2027e001 - Title (225.0).mp4"
+    assert moved.read_bytes() == b"video"
+    assert episode.file == moved
+    assert not file.exists()
@@ -0,0 +1,104 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from opsdownloader.core.type import Types
+from opsdownloader.gateways.plex_index import PlexIndex
+
+
+@pytest.fixture
+def library(tmp_path: Path) -> Path:
+    library = tmp_path / "plex"
+    for season, names in {
+        2025: ["OP QA - s2025e099 - Last Year (200.0).mp4"],
+        2026: [
+            "OP QA - s2026e001 - First (201.0).mp4",
+            "OP QA - s2026e002 - Second: Part 2 (202.5).mkv",
+            "OP QA - s2026e004 - Fourth (204.0).mp4",
+            "OP QA - s2026e005 - Fourth Again (204.0).mp4",
+            "OP QA - s2026e006 - Subtitles (206.0).srt",
+            "Not an episode.mp4",
+        ],
+    }.items():
+        season_dir = library / "OP QA" / f"Season {season}"
+        season_dir.mkdir(parents=True)
+        for name in names:
+            (season_dir / name).touch()
+    (library / "OP QA" / "Extras").mkdir()
+    return library
+
+
+def index(library: Path) -> PlexIndex:
+    index = PlexIndex(library, library.parent / "index.json")
+    index.refresh()
+    return index
+
+
+def test_parse_episode_files(library: Path):
+    entries = index(library).entries(Types.QA)
+
+    assert sorted((entry.season, entry.number, entry.ops_number) for entry in entries) == [
+        (2025, 99, 200.0),
+        (2026, 1, 201.0),
+        (2026, 2, 202.5),
+        (2026, 4, 204.0),
+        (2026, 5, 204.0),
+    ]
+
+
+def test_last_episode_duplicates_and_gaps(library: Path):
+    plex_index = index(library)
+
+    last = plex_index.last_episode(Types.QA)
+    assert last and (last.season, last.number) == (2026, 5)
+    assert plex_index.last_episode(Types.CLASS) is None
+    duplicates = plex_index.duplicates(Types.QA)
+    assert list(duplicates) == [204.0]
+    assert sorted(duplicates[204.0]) == [
+        "OP QA - s2026e004 - Fourth (204.0).mp4",
+        "OP QA - s2026e005 - Fourth Again (204.0).mp4",
+    ]
+    assert plex_index.gaps(Types.QA, 2026) == [3]
+
+
+def test_only_rescan_changed_seasons(library: Path):
+    season_dir = library / "OP QA" / "Season 2026"
+    stat = season_dir.stat()
+    index(library)
+
+    # A new file in an unchanged directory isn't seen
+    (season_dir / "OP QA - s2026e003 - Third (203.0).mp4").touch()
+    os.utime(season_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert index(library).gaps(Types.QA, 2026) == [3]
+
+    os.utime(season_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert index(library).gaps(Types.QA, 2026) == []
+
+
+def test_forget_removed_seasons(library: Path):
+    index(library)
+    for file in (library / "OP QA" / "Season 2026").iterdir():
+        file.unlink()
+    (library / "OP QA" / "Season 2026").rmdir()
+
+    last = index(library).last_episode(Types.QA)
+    assert last and last.season == 2025
+
+
+def test_ignore_index_of_another_library(library: Path, tmp_path: Path):
+    index(library)
+
+    other = PlexIndex(tmp_path / "other", library.parent / "index.json")
+    assert other.entries(Types.QA) == []
+
+
+def test_add_moved_episode(library: Path):
+    plex_index = index(library)
+    file = library / "OP QA" / "Season 2026" / "OP QA - s2026e006 - Sixth (206.0).mp4"
+    file.touch()
+
+    plex_index.add(Types.QA, 2026, 6, 206.0, file)
+
+    last = PlexIndex(library, library.parent / "index.json").last_episode(Types.QA)
+    assert last and (last.number, last.ops_number, last.name) == (6, 206.0, file.name)
@@ -0,0 +1,80 @@
+import pytest
+
+from opsdownloader.utils.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, TransientError
+
+
+def fail(error: Exception):
+    def func():
+        raise error
+
+    return func
+
+
+def test_circuit_opens_after_failures_in_a_row():
+    breaker = CircuitBreaker("host", failures=2, reset_after=60)
+    breaker.before()
+    breaker.failure()
+    breaker.before()
+    breaker.failure()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+
+
+def test_success_resets_the_failures():
+    breaker = CircuitBreaker("host", failures=2, reset_after=60)
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+
+    assert breaker.before() is False
+
+
+def test_half_open_lets_one_call_through():
+    breaker = CircuitBreaker("host", failures=1, reset_after=0)
+    breaker.failure()
+
+    assert breaker.before() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+
+    breaker.success()
+    assert breaker.before() is False
+
+
+def test_failed_probe_opens_the_circuit_again():
+    breaker = CircuitBreaker("host", failures=3, reset_after=0)
+    for _ in range(3):
+        breaker.failure()
+
+    assert breaker.before() is True
+    breaker.failure()
+    assert breaker.before() is True
+
+
+def test_never_opens_without_failures():
+    breaker = CircuitBreaker("host", failures=0, reset_after=60)
+    for _ in range(10):
+        breaker.failure()
+
+    assert breaker.before() is False
+
+
+def test_probe_with_error_that_isnt_transient_is_settled():
+    retry = RetryPolicy(attempts=1, breaker_failures=1, breaker_reset=0)
+    with pytest.raises(TransientError):
+        retry.attempt("host", fail(TransientError("Timeout")))
+    with pytest.raises(ValueError):
+        retry.attempt("host", fail(ValueError("Invalid page")))
+
+    assert retry.attempt("host", lambda: "ok") == "ok"
+
+
+def test_open_circuit_skips_the_call():
+    retry = RetryPolicy(attempts=1, breaker_failures=1, breaker_reset=60)
+    with pytest.raises(TransientError):
+        retry.attempt("host", fail(TransientError("Timeout")))
+
+    with pytest.raises(CircuitOpenError):
+        retry.attempt("host", lambda: "ok")
+    assert retry.attempt("other", lambda: "ok") == "ok"
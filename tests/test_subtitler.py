@@ -0,0 +1,68 @@
+import importlib.util
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from opsdownloader.gateways import subtitler
+from opsdownloader.gateways.subtitler import Subtitler, _generate
+
+
+class FakeSegment:
+    def __init__(self, start: float, end: float, text: str) -> None:
+        self.start = start
+        self.end = end
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self) -> None:
+        self.windows: List[int] = []
+
+    def transcribe(self, samples, language: str, vad_filter: bool):
+        self.windows.append(len(samples))
+        return [FakeSegment(0.5, 1.25, f" Window {len(self.windows)}")], None
+
+
+@pytest.fixture
+def model(monkeypatch: pytest.MonkeyPatch) -> FakeModel:
+    pytest.importorskip("numpy")
+    model = FakeModel()
+    # 2.5 seconds of audio in windows of 1 second
+    audio = bytes(2 * subtitler._sample_rate * 5 // 2)
+
+    def decode_audio(file: str, size: int) -> Iterator[bytes]:
+        view = memoryview(audio)
+        while view:
+            yield bytes(view[:size])
+            view = view[size:]
+
+    monkeypatch.setattr(subtitler, "_model", model)
+    monkeypatch.setattr(subtitler, "_window_seconds", 1)
+    monkeypatch.setattr(subtitler, "_decode_audio", decode_audio)
+    return model
+
+
+def test_transcribe_in_windows(model: FakeModel, tmp_path: Path):
+    srt = Path(_generate("episode.mp4", str(tmp_path), "small", "en"))
+
+    assert model.windows == [16000, 16000, 8000]
+    assert srt.read_text(encoding="utf-8") == (
+        "1\n00:00:00,500 --> 00:00:01,250\nWindow 1\n\n"
+        + "2\n00:00:01,500 --> 00:00:02,250\nWindow 2\n\n"
+        + "3\n00:00:02,500 --> 00:00:03,250\nWindow 3\n"
+    )
+
+
+def test_use_cached_transcript(model: FakeModel, tmp_path: Path):
+    first = _generate("episode.mp4", str(tmp_path), "small", "en")
+    second = _generate("episode.mp4", str(tmp_path), "small", "en")
+
+    assert first == second
+    assert len(model.windows) == 3
+
+
+@pytest.mark.skipif(importlib.util.find_spec("faster_whisper") is not None, reason="faster-whisper is installed")
+def test_clear_message_without_faster_whisper(tmp_path: Path):
+    with pytest.raises(SystemExit):
+        Subtitler(tmp_path)
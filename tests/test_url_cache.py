@@ -0,0 +1,32 @@
+import time
+from pathlib import Path
+
+from mockito import unstub, when
+
+from opsdownloader.gateways.url_cache import UrlCache
+
+
+def test_expires_from_signed_url(tmp_path: Path):
+    cache = UrlCache(tmp_path / "url-cache.json")
+
+    url = "https://vod.example.com/exp=1660000000~acl=%2F*~hmac=abc/video.mp4"
+    assert cache._expires(url) == 1660000000
+    assert cache._expires("https://vod.example.com/video.mp4?token=exp%3D1660000001~hmac%3Dabc") == 1660000001
+
+
+def test_expires_from_query(tmp_path: Path):
+    cache = UrlCache(tmp_path / "url-cache.json")
+
+    assert cache._expires("https://cdn.example.com/video.mp4?expires=1660000002&sig=abc") == 1660000002
+    assert cache._expires("https://s3.example.com/video.mp4?Expires=1660000003&Signature=abc") == 1660000003
+
+
+def test_expires_after_default_ttl(tmp_path: Path):
+    cache = UrlCache(tmp_path / "url-cache.json", default_ttl=600)
+    when(time).time().thenReturn(1000.0)
+
+    try:
+        assert cache._expires("https://cdn.example.com/video.mp4") == 1600
+        assert cache._expires("https://cdn.example.com/video.mp4?expires=never") == 1600
+    finally:
+        unstub()
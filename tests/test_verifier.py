@@ -0,0 +1,102 @@
+import hashlib
+import os
+from pathlib import Path
+
+import pytest
+from mockito import unstub, when
+
+from opsdownloader.core.episode import Episode
+from opsdownloader.gateways.integrity_index import IntegrityIndex
+from opsdownloader.gateways.plex import Plex
+from opsdownloader.gateways.verifier import VerificationError, Verifier
+
+
+@pytest.fixture(autouse=True)
+def cleanup():
+    yield
+    unstub()
+
+
+def verifier(duration: float = 60.0) -> Verifier:
+    verifier = Verifier()
+    when(verifier)._probe_duration(...).thenReturn(duration)
+    return verifier
+
+
+def test_verify_episode(tmp_path: Path):
+    content = os.urandom(5 * 1024 * 1024)
+    episode = Episode()
+    episode.file = tmp_path / "episode.mp4"
+    episode.file.write_bytes(content)
+    episode.ops.duration = 61.5
+
+    verifier().verify(episode)
+
+    assert episode.sha256 == hashlib.sha256(content).hexdigest()
+    assert episode.duration == 60.0
+
+
+def test_missing_or_empty_file(tmp_path: Path):
+    with pytest.raises(VerificationError):
+        verifier().verify_file(tmp_path / "missing.mp4")
+
+    (tmp_path / "empty.mp4").touch()
+    with pytest.raises(VerificationError):
+        verifier().verify_file(tmp_path / "empty.mp4")
+
+
+def test_duration_has_to_match_the_manifest(tmp_path: Path):
+    file = tmp_path / "episode.mp4"
+    file.write_bytes(b"video")
+
+    with pytest.raises(VerificationError):
+        verifier(50.0).verify_file(file, 60.0)
+    with pytest.raises(VerificationError):
+        verifier(0.0).verify_file(file)
+    assert verifier(50.0).verify_file(file).duration == 50.0
+
+
+def test_integrity_entry_is_invalid_when_the_file_changes(tmp_path: Path):
+    file = tmp_path / "OP QA" / "Season 2026" / "episode.mp4"
+    file.parent.mkdir(parents=True)
+    file.write_bytes(b"video")
+    index = IntegrityIndex(tmp_path)
+    index.add(file, "abc", 60.0)
+    index.save()
+
+    entry = IntegrityIndex(tmp_path).get(file)
+    assert entry and (entry.sha256, entry.duration, entry.ok) == ("abc", 60.0, True)
+
+    file.write_bytes(b"changed video")
+    assert IntegrityIndex(tmp_path).get(file) is None
+
+
+def test_remove_missing_files(tmp_path: Path):
+    file = tmp_path / "episode.mp4"
+    file.write_bytes(b"video")
+    index = IntegrityIndex(tmp_path)
+    index.add(file, "abc", 60.0)
+
+    file.unlink()
+    index.remove_missing()
+    index.save()
+
+    assert IntegrityIndex(tmp_path)._entries == {}
+
+
+def test_verify_library_only_verifies_new_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    library = tmp_path / "plex"
+    season_dir = library / "OP QA" / "Season 2026"
+    season_dir.mkdir(parents=True)
+    (season_dir / "OP QA - s2026e001 - Good (201.0).mp4").write_bytes(b"video")
+    (season_dir / "OP QA - s2026e002 - Broken (202.0).mp4").write_bytes(b"video")
+
+    checks = verifier()
+    when(checks)._probe_duration(season_dir / "OP QA - s2026e002 - Broken (202.0).mp4").thenReturn(0.0)
+
+    assert Plex(library).verify_library(checks, workers=2) == [season_dir / "OP QA - s2026e002 - Broken (202.0).mp4"]
+
+    # Verified files aren't read again, the broken one is still reported
+    when(checks)._probe_duration(...).thenRaise(AssertionError("Shouldn't verify again"))
+    assert Plex(library).verify_library(checks, workers=2) == [season_dir / "OP QA - s2026e002 - Broken (202.0).mp4"]
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+from mockito import mock, unstub, when
+
+from opsdownloader.gateways import waits
+from opsdownloader.gateways.waits import list_items_changed
+
+_no_results = ("xpath", ".//*[contains(text(), 'No results')]")
+
+
+@pytest.fixture(autouse=True)
+def cleanup():
+    yield
+    unstub()
+
+
+def snapshots(*texts: str):
+    list_waits = mock()
+    when(list_waits).list_items_snapshot(...).thenReturn(*texts)
+    return list_waits
+
+
+def test_changed_when_the_text_differs():
+    driver = mock()
+
+    assert not list_items_changed(snapshots("a"), "css", "a")(driver)
+    assert list_items_changed(snapshots("b"), "css", "a")(driver)
+
+
+def test_changed_when_no_results_are_shown():
+    driver = mock()
+    when(driver).find_elements(*_no_results).thenReturn(["No results"])
+
+    assert list_items_changed(snapshots(""), "css", "a", _no_results)(driver)
+
+
+def test_changed_when_the_list_stays_empty(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(waits, "_empty_settle", 0.05)
+    driver = mock()
+    when(driver).find_elements(...).thenReturn([])
+    condition = list_items_changed(snapshots("", "", "", ""), "css", "", _no_results)
+
+    assert not condition(driver)
+    time.sleep(0.06)
+    assert condition(driver)
+
+
+def test_not_changed_while_the_list_is_briefly_empty(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(waits, "_empty_settle", 0.05)
+    driver = mock()
+    when(driver).find_elements(...).thenReturn([])
+    condition = list_items_changed(snapshots("", "a", ""), "css", "a", _no_results)
+
+    assert not condition(driver)
+    time.sleep(0.06)
+    assert not condition(driver)
+    # Empty again, starts over
+    assert not condition(driver)